@@ -0,0 +1,112 @@
+from bs4 import BeautifulSoup, Comment
+from Metrics import METRICS
+
+BOXSCORE_URL = "https://www.baseball-reference.com/boxes/{}/{}.shtml"
+
+class Boxscore(object):
+    """
+        A boxscore page from baseball-reference.com. The page is fetched and
+        parsed once per game and every part of it is read from that one parse.
+        ...
+        Attributes
+        ----------
+        game_id : str
+            retrosheet/baseball-reference id of the game
+
+        url : str
+            url of the boxscore page
+
+        soup : BeautifulSoup
+            the parsed boxscore page
+
+        Methods
+        -------
+        lineups()
+            the starting lineups block, which is hidden in an html comment
+
+        linescore()
+            the runs per inning for the away and home team
+
+        table(table_id)
+            any table on the page, including the ones hidden in html comments
+    """
+    def __init__(self, game_id:str, page_cache):
+        """
+        Fetches and parses the boxscore page for the game
+        """
+        self.game_id = game_id.strip()
+
+        self.url = boxscore_url(self.game_id)
+        content = page_cache.fetch(self.url)
+        with METRICS.timer("html_parse"):
+            self.soup = BeautifulSoup(content, 'lxml')
+
+        self._comments = None
+        self._lineups = None
+        self._tables = {}
+
+    # get the html comments on the page, most of the tables live in them
+    def comments(self):
+        """
+        returns the html comments of the page
+        """
+        if(self._comments is None):
+            self._comments = self.soup.find_all(string=lambda text: isinstance(text, Comment))
+
+        return self._comments
+
+    # get the starting lineups
+    def lineups(self):
+        """
+        returns a BeautifulSoup object with the html of the starting lineups
+        """
+        if(self._lineups is None):
+            lineups_html = ""
+            for comment in self.comments():
+                if("div_lineups" in comment):
+                    lineups_html = comment
+
+            self._lineups = BeautifulSoup(lineups_html, 'lxml')
+
+        return self._lineups
+
+    # get a table by id from the page or from the comments
+    def table(self, table_id:str):
+        """
+        returns the table with the given id or None if it isnt on the page
+
+        Parameters
+        ----------
+        table_id : str
+            the html id of the table
+        """
+        if(table_id not in self._tables):
+            table = self.soup.find('table', id=table_id)
+
+            #baseball-reference hides most of its tables in comments
+            if(table is None):
+                for comment in self.comments():
+                    if(table_id in comment):
+                        table = BeautifulSoup(comment, 'lxml').find('table', id=table_id)
+                        if(table is not None):
+                            break
+
+            self._tables[table_id] = table
+
+        return self._tables[table_id]
+
+    # get the runs per inning for each team
+    def linescore(self):
+        """
+        returns the linescore as a list of rows, away team first. each row is
+        the list of cell values for that team
+        """
+        table = self.soup.find('table', class_="linescore")
+        rows = table.find('tbody').find_all('tr')
+
+        return [[td.text for td in r.find_all('td')] for r in rows]
+
+#build the url of a boxscore page from the game id
+def boxscore_url(game_id:str):
+    #the team abv is the first three characters of the game id
+    return BOXSCORE_URL.format(game_id[:3], game_id.strip())
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+from Metrics import METRICS, INFO
+
+class BuildManifest(object):
+    """
+        Remembers what has already been built. For every event file it records
+        the hash of the file's inputs, where its output went, whether its stats
+        were scraped or replayed offline and the hash of each game in it, so a
+        rerun only rebuilds new files, edited games and games built with an
+        older set of feature columns or the other stats mode.
+        ...
+        Attributes
+        ----------
+        path : str
+            the json file the manifest is kept in
+
+        feature_key : str
+            a hash of the feature columns, a change invalidates every game
+
+        mode : str
+            online or offline, how the stats of this run are computed. a file
+            built in the other mode is rebuilt from scratch
+
+        files : Dict[str, Dict]
+            the recorded build of each event file
+
+        Methods
+        -------
+        is_current(filepath, inputs_hash, output_path)
+            checks if an event file is already built from these inputs
+
+        stale_games(filepath, game_hashes)
+            the ids of the built games that have changed or been removed
+
+        record(filepath, inputs_hash, output_path, game_hashes)
+            records a finished build of an event file
+    """
+    def __init__(self, path="./data/build_manifest.json", feature_columns=(), mode="online"):
+        """
+        Loads the manifest, starting a new one if the feature columns have changed
+        """
+        self.path = path
+        self.feature_key = hash_text(",".join(feature_columns))
+        self.mode = mode
+        self.files = {}
+
+        if(os.path.exists(path)):
+            with open(path) as file:
+                manifest = json.load(file)
+
+            if(manifest.get("feature_key") == self.feature_key):
+                self.files = manifest["files"]
+            else:
+                METRICS.log(INFO, "feature columns have changed... every game will be rebuilt")
+
+    def is_current(self, filepath:str, inputs_hash:str, output_path:str):
+        """
+        returns True if the event file was built from the same inputs in the
+        same mode into an output that still exists
+        """
+        entry = self.files.get(filepath)
+        return (entry is not None and entry["inputs_hash"] == inputs_hash and entry.get("mode") == self.mode and
+                entry["output"] == output_path and os.path.exists(output_path))
+
+    def stale_games(self, filepath:str, game_hashes):
+        """
+        returns the ids of the games that were built before but have since been
+        edited or removed from the event file. every built game is stale if the
+        file was built in the other mode
+
+        Parameters
+        ----------
+        filepath : str
+            the event file
+
+        game_hashes : Dict[str, str]
+            the current hash of each game in the file
+        """
+        entry = self.files.get(filepath)
+        if(entry is None):
+            return set()
+
+        #the rows hold the other mode's ids and stats
+        if(entry.get("mode") != self.mode):
+            return set(entry["games"])
+
+        return set(game_id for game_id, game_hash in entry["games"].items()
+                   if game_hashes.get(game_id) != game_hash)
+
+    def record(self, filepath:str, inputs_hash:str, output_path:str, game_hashes):
+        """
+        records a finished build of an event file and saves the manifest
+        """
+        self.files[filepath] = {"inputs_hash": inputs_hash,
+                                "mode": self.mode,
+                                "output": output_path,
+                                "games": game_hashes
+                                }
+        self.save()
+
+    def save(self):
+        """
+        writes the manifest, replacing the old one in a single step
+        """
+        directory = os.path.dirname(self.path)
+        if(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.path + ".tmp", 'w') as file:
+            json.dump({"feature_key": self.feature_key, "files": self.files}, file)
+        os.replace(self.path + ".tmp", self.path)
+
+#hash a string
+def hash_text(text:str):
+    return hashlib.sha1(text.encode()).hexdigest()
+
+#hash the content of a file
+def hash_file(filepath:str):
+    sha = hashlib.sha1()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha.update(block)
+
+    return sha.hexdigest()
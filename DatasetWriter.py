@@ -0,0 +1,384 @@
+import csv
+import os
+from Metrics import METRICS, INFO
+
+#the feature columns that arent float32 rates
+CATEGORICAL_COLUMNS = ["home_team", "away_team", "wind_direction"]
+INTEGER_COLUMNS = ["temperature", "wind_speed"]
+STRING_COLUMNS = ["game_id", "date"]
+TARGET_COLUMN = "first_inning_total"
+
+class CsvDatasetWriter(object):
+    """
+        Streams dataset records into a csv file. Records are buffered and
+        appended to the file in batches, and a rerun picks up where the last
+        one stopped by skipping the games that are already in the file.
+        ...
+        Attributes
+        ----------
+        filepath : str
+            the csv file the records are written to
+
+        columns : [str]
+            the columns of the dataset, must include game_id
+
+        batch_size : int
+            how many records are buffered before they are written
+
+        written_ids : Set[str]
+            the ids of the games already in the file
+
+        Methods
+        -------
+        write(record)
+            buffers a record and writes the buffer when it is full
+
+        flush()
+            writes the buffered records to the file
+
+        discard(game_ids)
+            removes the records of some games from the file
+
+        close()
+            flushes and closes the file
+    """
+    def __init__(self, filepath:str, columns, batch_size=25):
+        """
+        Opens the csv file, reading the game ids that are already written
+        """
+        self.filepath = filepath
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.written_ids = set()
+        self._buffer = []
+
+        write_header = not self._load_existing()
+
+        self._file = open(filepath, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns)
+        if(write_header):
+            self._writer.writeheader()
+            self._file.flush()
+
+    # read the ids of the games in an existing file
+    # returns True if the file can be appended to
+    def _load_existing(self):
+        if(not os.path.exists(self.filepath) or os.path.getsize(self.filepath) == 0):
+            return False
+
+        #drop a partial last line left behind by a crash
+        with open(self.filepath, 'rb+') as file:
+            content = file.read()
+            if(not content.endswith(b"\n")):
+                file.truncate(content.rfind(b"\n") + 1)
+
+        with open(self.filepath, newline='') as file:
+            reader = csv.DictReader(file)
+            if(reader.fieldnames != self.columns):
+                METRICS.log(INFO, "columns in ", self.filepath, " have changed... starting the file over")
+                os.remove(self.filepath)
+                return False
+
+            for row in reader:
+                self.written_ids.add(row["game_id"])
+
+        METRICS.log(INFO, "found ", len(self.written_ids), " games already written to ", self.filepath)
+        return True
+
+    def __contains__(self, game_id):
+        return game_id in self.written_ids
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record):
+        """
+        buffers a record, the buffer is written once it holds batch_size records
+
+        Parameters
+        ----------
+        record : Dict[str, object]
+            the dataset record for a game
+        """
+        self._buffer.append(record)
+        if(len(self._buffer) >= self.batch_size):
+            self.flush()
+
+    def flush(self):
+        """
+        writes the buffered records to the file
+        """
+        if(not self._buffer):
+            return
+
+        self._writer.writerows(self._buffer)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        for record in self._buffer:
+            self.written_ids.add(record["game_id"])
+        self._buffer = []
+
+    def discard(self, game_ids):
+        """
+        removes the records of the given games from the file so they can be
+        written again
+
+        Parameters
+        ----------
+        game_ids : Set[str]
+            the ids of the games to remove
+        """
+        game_ids = set(game_ids) & self.written_ids
+        if(not game_ids):
+            return
+
+        self.flush()
+        self._file.close()
+
+        with open(self.filepath, newline='') as file:
+            rows = [row for row in csv.DictReader(file) if row["game_id"] not in game_ids]
+
+        with open(self.filepath + ".tmp", 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=self.columns)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(self.filepath + ".tmp", self.filepath)
+
+        self.written_ids -= game_ids
+        self._file = open(self.filepath, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns)
+        METRICS.log(INFO, "removed ", len(game_ids), " stale games from ", self.filepath)
+
+    def close(self):
+        """
+        flushes any buffered records and closes the file
+        """
+        self.flush()
+        self._file.close()
+
+class ParquetDatasetWriter(object):
+    """
+        Writes dataset records to a parquet partition with an explicit schema:
+        float32 rates, dictionary encoded team codes and an integer target.
+        Each flushed batch becomes a part file in the partition directory, and
+        a rerun skips the games already in the partition's part files.
+
+        Partitions are laid out as <root>/season=<season>/team=<team> so a
+        multi season training set can be read with read_parquet_dataset.
+        ...
+        Attributes
+        ----------
+        partition_dir : str
+            the directory the part files are written to
+
+        columns : [str]
+            the columns of the dataset, must include game_id
+
+        batch_size : int
+            how many records go into a part file
+
+        written_ids : Set[str]
+            the ids of the games already in the partition
+
+        Methods
+        -------
+        write(record)
+            buffers a record and writes the buffer when it is full
+
+        flush()
+            writes the buffered records to a new part file
+
+        discard(game_ids)
+            removes the records of some games from the part files
+
+        close()
+            flushes the last records
+    """
+    def __init__(self, partition_dir:str, columns, batch_size=500):
+        """
+        Creates the partition directory, reading the game ids that are already written
+        """
+        import pyarrow.parquet as pq
+
+        self.partition_dir = partition_dir
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.schema = dataset_schema(self.columns)
+        self.written_ids = set()
+        self._buffer = []
+        self._parts = 0
+
+        os.makedirs(partition_dir, exist_ok=True)
+        for filepath in self._part_files():
+            #parts written with other columns cant be mixed with new ones
+            if(pq.read_schema(filepath).names != self.columns):
+                METRICS.log(INFO, "columns in ", partition_dir, " have changed... starting the partition over")
+                for old_part in self._part_files():
+                    os.remove(old_part)
+                self.written_ids = set()
+                break
+
+            part = pq.read_table(filepath, columns=["game_id"])
+            self.written_ids.update(part.column("game_id").to_pylist())
+
+        self._parts = max([int(f[-13:-8]) + 1 for f in self._part_files()], default=0)
+
+        if(self.written_ids):
+            METRICS.log(INFO, "found ", len(self.written_ids), " games already written to ", partition_dir)
+
+    def __contains__(self, game_id):
+        return game_id in self.written_ids
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record):
+        """
+        buffers a record, the buffer is written once it holds batch_size records
+
+        Parameters
+        ----------
+        record : Dict[str, object]
+            the dataset record for a game
+        """
+        self._buffer.append(record)
+        if(len(self._buffer) >= self.batch_size):
+            self.flush()
+
+    def flush(self):
+        """
+        writes the buffered records to a new part file
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if(not self._buffer):
+            return
+
+        data = {column: [convert_value(record.get(column), self.schema.field(column).type) for record in self._buffer]
+                for column in self.columns}
+        table = pa.Table.from_pydict(data, schema=self.schema)
+
+        #write to a temporary name so a crash never leaves a partial part file
+        filepath = os.path.join(self.partition_dir, "part-{:05d}.parquet".format(self._parts))
+        pq.write_table(table, filepath + ".tmp")
+        os.replace(filepath + ".tmp", filepath)
+        self._parts += 1
+
+        for record in self._buffer:
+            self.written_ids.add(record["game_id"])
+        self._buffer = []
+
+    def discard(self, game_ids):
+        """
+        removes the records of the given games from the part files so they can
+        be written again
+
+        Parameters
+        ----------
+        game_ids : Set[str]
+            the ids of the games to remove
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        game_ids = set(game_ids) & self.written_ids
+        if(not game_ids):
+            return
+
+        self.flush()
+        for filepath in self._part_files():
+            part = pq.read_table(filepath)
+            keep = pc.invert(pc.is_in(part.column("game_id"), value_set=pa.array(list(game_ids))))
+            if(pc.all(keep).as_py()):
+                continue
+
+            pq.write_table(part.filter(keep), filepath + ".tmp")
+            os.replace(filepath + ".tmp", filepath)
+
+        self.written_ids -= game_ids
+        METRICS.log(INFO, "removed ", len(game_ids), " stale games from ", self.partition_dir)
+
+    # the part files in the partition, in the order they were written
+    def _part_files(self):
+        return [os.path.join(self.partition_dir, f) for f in sorted(os.listdir(self.partition_dir))
+                if f.startswith("part-") and f.endswith(".parquet")]
+
+    def close(self):
+        """
+        writes any buffered records
+        """
+        self.flush()
+
+# build the explicit arrow schema for the dataset columns
+def dataset_schema(columns):
+    import pyarrow as pa
+
+    fields = []
+    for column in columns:
+        if(column in CATEGORICAL_COLUMNS):
+            fields.append(pa.field(column, pa.dictionary(pa.int8(), pa.string())))
+        elif(column in INTEGER_COLUMNS):
+            fields.append(pa.field(column, pa.int16()))
+        elif(column in STRING_COLUMNS):
+            fields.append(pa.field(column, pa.string()))
+        elif(column == TARGET_COLUMN):
+            fields.append(pa.field(column, pa.int8()))
+        else:
+            fields.append(pa.field(column, pa.float32()))
+
+    return pa.schema(fields)
+
+# convert a record value to the python type of its arrow column
+def convert_value(value, arrow_type):
+    import pyarrow as pa
+
+    if(value is None or value == ""):
+        return None
+    if(pa.types.is_integer(arrow_type)):
+        return int(value)
+    if(pa.types.is_floating(arrow_type)):
+        return float(value)
+
+    return str(value)
+
+# read a partitioned parquet dataset
+def read_parquet_dataset(root:str, seasons=None, teams=None, columns=None):
+    """
+    reads the partitioned parquet dataset into a DataFrame, only reading the
+    requested seasons, teams and columns
+
+    Parameters
+    ----------
+    root : str
+        the directory holding the season=/team= partitions
+
+    seasons : [int]
+        the seasons to read, all of them by default
+
+    teams : [str]
+        the home teams to read, all of them by default
+
+    columns : [str]
+        the columns to read, all of them by default
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+
+    condition = None
+    if(seasons is not None):
+        condition = ds.field("season").isin(list(seasons))
+    if(teams is not None):
+        team_condition = ds.field("team").isin(list(teams))
+        condition = team_condition if condition is None else condition & team_condition
+
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
@@ -1,68 +1,113 @@
-import requests
-from bs4 import BeautifulSoup
+from EventRecords import iter_plays, type_events
+from PlayInterpreter import first_inning_runs
+from Metrics import METRICS, DEBUG
+
+#the info records a dataset record uses, the rest of the info block is dropped
+INFO_FIELDS = ["visteam", "hometeam", "date", "temp", "winddir", "windspeed"]
 
 class EventGame(object):
     """
+        A game from a retrosheet event file. The lineups are kept as Starter
+        records and the starting pitchers are found once, when the lineups are
+        set, so a whole season of games can be held in memory cheaply.
+        ...
+        Attributes
+        ----------
+        id : str
+            retrosheet id of the game
+
+        info : (str)
+            the values of the INFO_FIELDS info records
+
+        events : (str)
+            the play, sub, com and data records of the game
+
+        home_lineup : (Starter)
+            the starting lineup of the home team
+
+        away_lineup : (Starter)
+            the starting lineup of the away team
+
+        home_pitcher : str
+            id of the home starting pitcher
+
+        away_pitcher : str
+            id of the away starting pitcher
     """
-    def __init__(self, id, info, events, home_lineup, away_lineup, ps):
-        self.id = id.strip()
-        self.info = info
-        self.events = events
-        self.home_lineup = home_lineup
-        self.away_lineup = away_lineup
+    __slots__ = ["id", "info", "events", "home_lineup", "away_lineup", "home_pitcher", "away_pitcher",
+                 "player_scraper"]
+
+    #only the parts of the GameRecords a game uses are kept
+    def __init__(self, records, ps):
+        self.id = records.game_id.strip()
+        self.info = tuple(records.info.get(field) for field in INFO_FIELDS)
+        self.events = tuple(records.events)
         self.player_scraper = ps
+        self.set_lineups(records.starters["1"], records.starters["0"])
 
     ###########################################################################
     ### INFO DICTIONARY WRAPPERS ##############################################
     def visitor(self):
-        return self.info["visteam"]
+        return self.info[0]
 
     def home_team(self):
-        return self.info["hometeam"]
+        return self.info[1]
 
     def date(self):
-        return self.info["date"]
+        return self.info[2]
 
     def temperature(self):
-        return self.info["temp"]
+        return self.info[3]
 
     def wind_direction(self):
-        return self.info["winddir"]
+        return self.info[4]
 
     def wind_speed(self):
-        return self.info["windspeed"]
+        return self.info[5]
+
+    #gets the season from the id
+    def season(self):
+        return int(self.id[3:7])
 
     #gets the date code from the id
     def date_code(self):
         return self.id[-5:]
 
-    #get the total score for the first inning
-    def get_first_inning_total(self):
-        print("scraping the first inning total")
-
-        team_id = self.id[:3]
-        url_pattern = "https://www.baseball-reference.com/boxes/{}/{}.shtml"
-        url = url_pattern.format(team_id, self.id)
+    #set the lineups and find the starting pitchers in them
+    def set_lineups(self, home_lineup, away_lineup):
+        self.home_lineup = tuple(home_lineup)
+        self.away_lineup = tuple(away_lineup)
+        self.home_pitcher = find_pitcher_id(self.home_lineup)
+        self.away_pitcher = find_pitcher_id(self.away_lineup)
 
-        #scrape the first inning score from the boxscore
-        resp = requests.get(url)
-        soup = BeautifulSoup(resp.content, "html.parser")
-        table = soup.find('table', {"class":"linescore nohover stats_table no_freeze"})
-        rows = table.find('tbody').find_all('tr')
+    #swap in the baseball-reference lineups for the game
+    def enrich(self, home_lineup, away_lineup):
+        self.set_lineups(home_lineup, away_lineup)
 
-        first_inning_score = 0
-        for r in rows:
-            first_inning_score += int(r.find_all('td')[2].text)
+    #the play, sub, com and data records typed one at a time, nothing is kept
+    def typed_events(self):
+        return type_events(self.events)
 
-        return first_inning_score
+    #get the total score for the first inning
+    #the runs are counted from the play records so no boxscore is needed
+    def get_first_inning_total(self):
+        METRICS.log(DEBUG, "counting the first inning total")
+        return sum(first_inning_runs(iter_plays(self.events)))
 
     ###########################################################################
     ### DATASET CREATOR #######################################################
     # creates the dictionary that will be used to add data to dataset
     def create_dataset_record(self):
-        print("creating dataset record for ", self.id)
+        with METRICS.timer("record"):
+            return self._build_dataset_record()
+
+    def _build_dataset_record(self):
+        METRICS.log(DEBUG, "creating dataset record for ", self.id)
+
+        #fetch all the gamelogs needed for the record in one batch
+        self.player_scraper.prefetch_gamelogs(self.batter_ids(), self.pitcher_ids(), self.season())
 
-        print("getting stats for home team")
+        METRICS.log(DEBUG, "getting stats for home team")
         # get the batting stats for the home players
         first_home_batter = self.get_home_batter_stats(1)
         second_home_batter = self.get_home_batter_stats(2)
@@ -70,7 +115,7 @@ class EventGame(object):
 
         home_pitcher = self.get_home_pitcher_stats()
 
-        print("getting stats for away team")
+        METRICS.log(DEBUG, "getting stats for away team")
         #get the batting stats for the away Players
         first_away_batter = self.get_away_batter_stats(1)
         second_away_batter = self.get_away_batter_stats(2)
@@ -79,6 +124,7 @@ class EventGame(object):
         away_pitcher = self.get_away_pitcher_stats()
 
         return {
+            "game_id": self.id,
             "date": self.date(),
             "home_team": self.home_team(),
             "away_team": self.visitor(),
@@ -127,41 +173,47 @@ class EventGame(object):
 
     #get the batting average for the first player in the batting lineup
     def get_home_batter_stats(self, bop):
-        player_id = self.home_lineup[bop-1].split(",")[1]
+        player_id = self.home_lineup[bop-1].player_id
         game_date = self.date_code()
-        return self.player_scraper.get_batting_stats(player_id, game_date)
+        return self.player_scraper.get_batting_stats(player_id, game_date, self.season())
 
     #get the batting average for the first player in the batting lineup
     def get_away_batter_stats(self, bop):
-        player_id = self.away_lineup[bop-1].split(",")[1]
+        player_id = self.away_lineup[bop-1].player_id
         game_date = self.date_code()
-        return self.player_scraper.get_batting_stats(player_id, game_date)
+        return self.player_scraper.get_batting_stats(player_id, game_date, self.season())
 
     #get the home pitching stats
     def get_home_pitcher_stats(self):
-        #find the pitcher by position in the lineup
-        for player in self.home_lineup:
-            if(player.split(",")[5] == '1'):
-                player_id = player.split(",")[1]
-
         game_date = self.date_code()
-        return self.player_scraper.get_pitching_stats(player_id, game_date)
+        return self.player_scraper.get_pitching_stats(self.home_pitcher, game_date, self.season())
 
     #get the away pitching STATS
     def get_away_pitcher_stats(self):
+        game_date = self.date_code()
+        return self.player_scraper.get_pitching_stats(self.away_pitcher, game_date, self.season())
 
-        #find the pitcher by possistion in the lineup
-        for player in self.away_lineup:
-            if(player.split(",")[5] == '1'):
-                player_id = player.split(",")[1]
+    #get the ids of the batters used in the dataset record
+    def batter_ids(self):
+        top_of_order = self.home_lineup[:3] + self.away_lineup[:3]
+        return [player.player_id for player in top_of_order]
 
-        game_date = self.date_code()
-        return self.player_scraper.get_pitching_stats(player_id, game_date)
+    #get the ids of the starting pitchers
+    def pitcher_ids(self):
+        return [self.home_pitcher, self.away_pitcher]
 
     ### DEBUG STUFF ##########################################################
     def display(self):
         print("ID: ", self.id)
-        print("INFO: ", self.info)
+        print("INFO: ", dict(zip(INFO_FIELDS, self.info)))
         print("EVENTS: ", self.events)
         print("HOME PLAYERS: ", self.home_lineup)
         print("AWAY PLAYERS: ", self.away_lineup)
+
+#find the starting pitcher by position in the lineup
+def find_pitcher_id(lineup):
+    for player in lineup:
+        if(player.position == 1):
+            return player.player_id
+
+    return None
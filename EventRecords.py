@@ -0,0 +1,188 @@
+""" Retrosheet Record Tokenizer
+
+Splits the lines of a game from a retrosheet event file into typed records in a
+single pass, dispatching each line on its record type.
+    - id, version and info records become attributes of the game
+    - start records become the Starter lineups of each team
+    - sub, com and data records are kept typed and in order
+    - play records, the bulk of every game, are kept as lines and only typed
+      into Plays when they are asked for, the Plays are never kept
+    - badj, padj, ladj, radj and presadj records become Adjustments
+"""
+from collections import namedtuple
+
+#a player in a starting lineup, parsed once from a retrosheet start record
+Starter = namedtuple("Starter", ["player_id", "batting_order", "position"])
+
+#sub,<player>,"<name>",<0 away|1 home>,<batting order>,<position>
+Substitution = namedtuple("Substitution", ["player_id", "name", "team", "batting_order", "position"])
+
+#play,<inning>,<0 away|1 home>,<batter>,<count>,<pitches>,<event>
+Play = namedtuple("Play", ["inning", "team", "batter", "count", "pitches", "event"])
+
+#data,<kind>,<player>,<value>, the only kind so far is er, the earned runs of a pitcher
+Data = namedtuple("Data", ["kind", "player_id", "value"])
+
+#badj/padj,<player>,<hand>, ladj,<team>,<batting order>, radj/presadj,<player>,<base>
+Adjustment = namedtuple("Adjustment", ["kind", "subject", "value"])
+
+ADJUSTMENT_RECORDS = ("badj", "padj", "ladj", "radj", "presadj")
+
+class GameRecords(object):
+    """
+        Every record of a game from a retrosheet event file
+        ...
+        Attributes
+        ----------
+        game_id : str
+            the id of the game
+
+        version : str
+            the version record of the game
+
+        info : Dict[str, str]
+            the info records keyed by their name
+
+        starters : Dict[str, [Starter]]
+            the starting lineup of the away (0) and home (1) teams
+
+        names : Dict[str, str]
+            the name of every player in a start or sub record
+
+        subs : [Substitution]
+            the sub records in order
+
+        comments : [str]
+            the text of the com records in order
+
+        data : [Data]
+            the data records
+
+        adjustments : [Adjustment]
+            the batter, pitcher, lineup and runner adjustment records
+
+        events : [str]
+            the raw play, com, sub and data lines in order
+
+        Methods
+        -------
+        plays()
+            the play records typed as Plays, in order
+
+        typed_events()
+            the play, sub, com and data records typed, in the order of events
+    """
+    __slots__ = ["game_id", "version", "info", "starters", "names", "subs", "comments", "data",
+                 "adjustments", "events"]
+
+    def __init__(self):
+        self.game_id = None
+        self.version = None
+        self.info = {}
+        self.starters = {"0": [], "1": []}
+        self.names = {}
+        self.subs = []
+        self.comments = []
+        self.data = []
+        self.adjustments = []
+        self.events = []
+
+    # type the play records, a new list every call
+    def plays(self):
+        return list(iter_plays(self.events))
+
+    # the typed play, sub, com and data records in the order they happened
+    def typed_events(self):
+        return type_events(self.events)
+
+# tokenize the lines of a game in one pass
+def tokenize_game(game_chunk):
+    """ Splits the lines of a game into typed records, looking at each line once
+
+    Parameters
+    ----------
+    game_chunk : [str]
+        the lines of a game, starting with its id record
+
+    Returns
+    -------
+    records : GameRecords
+        the records of the game
+    """
+    records = GameRecords()
+
+    for line in game_chunk:
+        line = line.strip()
+        kind, _, rest = line.partition(",")
+
+        if(kind == "play"):
+            records.events.append(line)
+
+        elif(kind == "info"):
+            key, _, value = rest.partition(",")
+            records.info[key] = value
+
+        elif(kind == "start" or kind == "sub"):
+            sub = split_lineup_record(rest)
+            records.names[sub.player_id] = sub.name
+
+            if(kind == "start"):
+                records.starters.setdefault(sub.team, []).append(Starter(sub.player_id, sub.batting_order, sub.position))
+            else:
+                records.subs.append(sub)
+                records.events.append(line)
+
+        elif(kind == "com"):
+            records.comments.append(rest.strip('"'))
+            records.events.append(line)
+
+        elif(kind == "data"):
+            records.data.append(split_data_record(rest))
+            records.events.append(line)
+
+        elif(kind in ADJUSTMENT_RECORDS):
+            subject, _, value = rest.partition(",")
+            records.adjustments.append(Adjustment(kind, subject, value))
+
+        elif(kind == "id"):
+            records.game_id = rest
+
+        elif(kind == "version"):
+            records.version = rest
+
+    return records
+
+#parse a play record into a Play
+def parse_play(record:str):
+    inning, team, batter, count, pitches, event = record.split(",", 6)[1:]
+    return Play(int(inning), team, batter, count, pitches, event)
+
+#split the fields after the record type of a start or sub record
+#the name is quoted and can hold a comma so the other fields are split from the ends
+def split_lineup_record(rest:str):
+    player_id, _, rest = rest.partition(",")
+    name, team, batting_order, position = rest.rsplit(",", 3)
+    return Substitution(player_id, name.strip('"'), team, int(batting_order), int(position))
+
+#split the fields after the record type of a data record, er values are ints
+def split_data_record(rest:str):
+    kind, player_id, value = rest.split(",", 2)
+    return Data(kind, player_id, int(value) if value.isdigit() else value)
+
+#type the play records of a list of event lines one at a time
+def iter_plays(events):
+    return (parse_play(event) for event in events if event.startswith("play,"))
+
+#type the play, sub, com and data lines of a game one at a time, in order
+#comments come through as their text
+def type_events(events):
+    for event in events:
+        kind, _, rest = event.partition(",")
+        if(kind == "play"):
+            yield parse_play(event)
+        elif(kind == "sub"):
+            yield split_lineup_record(rest)
+        elif(kind == "com"):
+            yield rest.strip('"')
+        elif(kind == "data"):
+            yield split_data_record(rest)
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from EventRecords import iter_plays
+from PlayInterpreter import first_inning_runs
+from SeasonEngine import batting_rates, pitching_rates, check_season, game_key
+
+#the batters in the dataset and the prefix of their columns
+BATTER_PREFIXES = ["first", "second", "third"]
+
+#the column suffix of each stat, matching EventGame.create_dataset_record
+BATTING_SUFFIXES = {"BA": "ba", "OBP": "obp", "SLG": "slg", "OPS": "ops"}
+PITCHING_SUFFIXES = {"ERA": "ERA", "WHIP": "WHIP", "FIP": "FIP", "KO_perc": "KOP", "BB_perc": "BBP"}
+
+#flatten a batch of games into a table with one row per game
+def games_table(games):
+    """
+    builds a table of the games with the info columns, the game key, the ids
+    of the top three batters and starting pitcher of each team and the target
+
+    Parameters
+    ----------
+    games : [EventGame]
+        the games, with lineups that have at least three batters
+
+    Returns
+    -------
+    table : DataFrame
+        a row per game in the order of the games
+    """
+    columns = {"game_id": [], "date": [], "home_team": [], "away_team": [], "temperature": [],
+               "wind_direction": [], "wind_speed": [], "game_key": [], "home_pitcher": [], "away_pitcher": [],
+               "first_inning_total": []}
+    for side in ["home", "away"]:
+        for prefix in BATTER_PREFIXES:
+            columns["{}_{}_batter".format(prefix, side)] = []
+
+    for game in games:
+        columns["game_id"].append(game.id)
+        columns["date"].append(game.date())
+        columns["home_team"].append(game.home_team())
+        columns["away_team"].append(game.visitor())
+        columns["temperature"].append(game.temperature())
+        columns["wind_direction"].append(game.wind_direction())
+        columns["wind_speed"].append(game.wind_speed())
+        columns["game_key"].append(game_key(game.id))
+        columns["home_pitcher"].append(game.home_pitcher)
+        columns["away_pitcher"].append(game.away_pitcher)
+        columns["first_inning_total"].append(sum(first_inning_runs(iter_plays(game.events))))
+
+        for side, lineup in [("home", game.home_lineup), ("away", game.away_lineup)]:
+            for prefix, starter in zip(BATTER_PREFIXES, lineup):
+                columns["{}_{}_batter".format(prefix, side)].append(starter.player_id)
+
+    return pd.DataFrame(columns)
+
+#build the dataset rows for a batch of games in one pass
+def build_feature_matrix(games, engine):
+    """
+    builds the dataset rows for every game at once. the stats going into each
+    game are found for all the batters, then all the pitchers, with one sorted
+    search each against the cumulative tables of a replayed season instead of
+    a lookup per player per game
+
+    Parameters
+    ----------
+    games : [EventGame]
+        the games to build, all from the season of the engine
+
+    engine : SeasonEngine
+        the replayed season
+
+    Returns
+    -------
+    features : DataFrame
+        the same columns as EventGame.create_dataset_record, a row per game
+    """
+    table = games_table(games)
+    for season in set(table["game_key"] // 10**5):
+        check_season(engine, season)
+
+    keys = table["game_key"].values
+    features = table[["game_id", "date", "home_team", "away_team", "temperature", "wind_direction", "wind_speed"]].copy()
+
+    #every batter slot of every game in a single search
+    batter_columns = ["{}_{}_batter".format(prefix, side) for side in ["home", "away"] for prefix in BATTER_PREFIXES]
+    batter_ids = np.concatenate([table[column].values for column in batter_columns])
+    batting = batting_rates(engine.totals_before_many(batter_ids, "b", np.tile(keys, len(batter_columns))))
+
+    for slot, column in enumerate(batter_columns):
+        rows = slice(slot * len(table), (slot + 1) * len(table))
+        prefix = column[:-len("_batter")]
+        for stat, suffix in BATTING_SUFFIXES.items():
+            features["{}_{}".format(prefix, suffix)] = batting[stat][rows]
+
+    #both starting pitchers of every game in a single search
+    pitcher_ids = np.concatenate([table["home_pitcher"].values, table["away_pitcher"].values])
+    pitching = pitching_rates(engine.totals_before_many(pitcher_ids, "p", np.tile(keys, 2)))
+
+    for slot, side in enumerate(["home", "away"]):
+        rows = slice(slot * len(table), (slot + 1) * len(table))
+        for stat, suffix in PITCHING_SUFFIXES.items():
+            features["{}_{}".format(side, suffix)] = pitching[stat][rows]
+
+    features["first_inning_total"] = table["first_inning_total"].values
+    return features
@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+from Metrics import METRICS, DEBUG
+
+class FetchEngine(object):
+    """
+        Fetches batches of pages concurrently through a page cache. Only pages
+        missing from the cache touch the network, and those are capped by a
+        concurrency limit here and by the rate limit of the page cache's http
+        client.
+        ...
+        Attributes
+        ----------
+        page_cache : PageCache
+            the cache the pages are read from and stored in
+
+        max_workers : int
+            the maximum number of requests in flight at once
+
+        Methods
+        -------
+        fetch_all(urls)
+            fetches every url and returns a dictionary of url to content
+    """
+    def __init__(self, page_cache, max_workers=4):
+        """
+        Initializes the engine
+        """
+        self.page_cache = page_cache
+        self.max_workers = max_workers
+
+    # fetch a batch of urls in parallel
+    def fetch_all(self, urls):
+        """
+        fetches a batch of pages, the ones that arent cached are fetched in parallel
+
+        Parameters
+        ----------
+        urls : [str]
+            the urls of the pages to fetch
+
+        Returns
+        -------
+        pages : Dict[str, bytes]
+            the content of each page keyed by its url
+        """
+        pages = {}
+        missing = []
+        for url in dict.fromkeys(urls):
+            content = self.page_cache.get(url)
+            if(content is None):
+                missing.append(url)
+            else:
+                pages[url] = content
+
+        if(missing):
+            METRICS.log(DEBUG, "fetching ", len(missing), " pages with ", self.max_workers, " workers...")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for url, content in zip(missing, executor.map(self.page_cache.fetch, missing)):
+                    pages[url] = content
+
+        return pages
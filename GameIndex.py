@@ -0,0 +1,190 @@
+""" Retrosheet Game Index
+
+Maps each game id in a retrosheet event file to the byte offset and length of
+its records, so a single game can be read without scanning the file.
+    - the index is built in one scan of the file and saved as json in
+      ./data/game_index/<event file>.json
+    - an index is rebuilt when the size or modification time of its event file
+      changes
+    - games are read through an mmap of the event file
+
+Index event files, or rebuild the dataset rows of chosen games
+    python GameIndex.py build <event file> ...
+    python GameIndex.py rebuild <game id> ... [--offline] [--parquet]
+"""
+import json
+import mmap
+import os
+import sys
+
+INDEX_DIR = "./data/game_index/"
+
+class GameIndex(object):
+    """
+        The byte offset and length of every game in a retrosheet event file
+        ...
+        Attributes
+        ----------
+        datafile : str
+            the event file
+
+        games : Dict[str, (int, int)]
+            the offset and length of each game keyed by the game id, in file order
+
+        size : int
+            the size of the event file when it was indexed
+
+        mtime : int
+            the modification time of the event file when it was indexed (ns)
+
+        Methods
+        -------
+        build(datafile)
+            indexes an event file in one scan
+
+        load(datafile, index_dir)
+            reads the saved index of an event file, rebuilding it if it is stale
+
+        save(index_dir)
+            writes the index as json
+
+        game_ids()
+            the ids of the games in file order
+
+        chunk(game_id)
+            the lines of one game
+
+        close()
+            closes the mmap of the event file
+    """
+    def __init__(self, datafile:str, games, size:int, mtime:int):
+        """
+        Initializes the index, the event file is mapped on first use
+        """
+        self.datafile = datafile
+        self.games = games
+        self.size = size
+        self.mtime = mtime
+        self._map = None
+        self._file = None
+
+    @classmethod
+    def build(cls, datafile:str):
+        """
+        indexes an event file in one scan for the id records
+        """
+        stat = os.stat(datafile)
+        games = {}
+
+        with open(datafile, 'rb') as file:
+            if(stat.st_size):
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    #the offset of every id record
+                    starts = [0] if data[:3] == b"id," else []
+                    position = data.find(b"\nid,")
+                    while(position != -1):
+                        starts.append(position + 1)
+                        position = data.find(b"\nid,", position + 1)
+
+                    #each game runs until the next id record
+                    for start, end in zip(starts, starts[1:] + [len(data)]):
+                        line_end = data.find(b"\n", start, end)
+                        id_line = data[start:line_end if line_end != -1 else end].decode()
+                        games[id_line.split(",")[1].strip()] = (start, end - start)
+
+        return cls(datafile, games, stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def load(cls, datafile:str, index_dir=INDEX_DIR):
+        """
+        reads the saved index of an event file, building and saving a new one
+        if there isnt one or the event file has changed since
+        """
+        path = index_path(datafile, index_dir)
+        stat = os.stat(datafile)
+
+        if(os.path.exists(path)):
+            with open(path) as file:
+                saved = json.load(file)
+
+            if(saved["size"] == stat.st_size and saved["mtime"] == stat.st_mtime_ns):
+                games = {game_id: tuple(span) for game_id, span in saved["games"].items()}
+                return cls(datafile, games, saved["size"], saved["mtime"])
+
+        index = cls.build(datafile)
+        index.save(index_dir)
+        return index
+
+    def save(self, index_dir=INDEX_DIR):
+        """
+        writes the index as json, replacing the old one in a single step
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        path = index_path(self.datafile, index_dir)
+
+        with open(path + ".tmp", 'w') as file:
+            json.dump({"size": self.size, "mtime": self.mtime, "games": self.games}, file)
+        os.replace(path + ".tmp", path)
+
+    def __contains__(self, game_id):
+        return game_id in self.games
+
+    def __len__(self):
+        return len(self.games)
+
+    def game_ids(self):
+        """
+        returns the ids of the games in the order they are in the file
+        """
+        return list(self.games)
+
+    def chunk(self, game_id:str):
+        """
+        returns the lines of a game, the same lines parser.iter_game_chunks
+        yields for it
+
+        Parameters
+        ----------
+        game_id : str
+            the id of the game
+
+        Raises
+        ------
+        KeyError
+            the game isnt in the event file
+        """
+        offset, length = self.games[game_id]
+        if(self._map is None):
+            self._file = open(self.datafile, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        text = self._map[offset:offset + length].decode()
+        return text.replace("\r\n", "\n").splitlines(keepends=True)
+
+    def close(self):
+        """
+        closes the mmap of the event file
+        """
+        if(self._map is not None):
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+#where the index of an event file is saved
+def index_path(datafile:str, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, os.path.basename(datafile) + ".json")
+
+if __name__ == "__main__":
+    command = sys.argv[1]
+    args = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+
+    if(command == "build"):
+        for datafile in args:
+            index = GameIndex.build(datafile)
+            index.save()
+            print("indexed ", len(index), " games in ", datafile)
+    else:
+        from parser import rebuild_games
+        rebuild_games(args, offline="--offline" in sys.argv,
+                      output_format="parquet" if "--parquet" in sys.argv else "csv")
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+from Metrics import METRICS
+
+class GamelogCache(object):
+    """
+        In memory least recently used cache of player gamelogs. Keys are
+        (player_id, log_type, season) tuples so batting and pitching gamelogs of
+        the same player never collide.
+        ...
+        Attributes
+        ----------
+        max_entries : int
+            the most gamelogs kept in the cache (None for no limit)
+
+        max_bytes : int
+            the most memory the cached gamelogs can use (None for no limit)
+
+        hits : int
+            number of lookups that found the gamelog
+
+        misses : int
+            number of lookups that didnt find the gamelog
+
+        evictions : int
+            number of gamelogs removed to stay under the limits
+
+        Methods
+        -------
+        stats()
+            returns the counters and the size of the cache
+
+        clear()
+            removes every gamelog from the cache
+    """
+    def __init__(self, max_entries=None, max_bytes=256 * 1024**2):
+        """
+        Initializes the cache
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    # look up a gamelog and mark it as the most recently used
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                gamelog = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                METRICS.count("gamelog_cache_misses")
+                raise
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            METRICS.count("gamelog_cache_hits")
+
+        return gamelog
+
+    # add a gamelog and evict the least recently used ones if needed
+    def __setitem__(self, key, gamelog):
+        size = int(gamelog.table.memory_usage(deep=True).sum())
+
+        with self._lock:
+            if(key in self._entries):
+                self._bytes -= self._sizes[key]
+
+            self._entries[key] = gamelog
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+
+            #never evict the gamelog that was just added
+            while(len(self._entries) > 1 and self._over_limit()):
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _over_limit(self):
+        return ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes))
+
+    def stats(self):
+        """
+        returns the hit/miss/eviction counters and the size of the cache
+        """
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes
+                }
+
+    def clear(self):
+        """
+        removes every gamelog from the cache
+        """
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
@@ -0,0 +1,145 @@
+import pickle
+import threading
+import time
+import zlib
+from Metrics import METRICS
+from SqliteConnection import SqliteConnection
+
+#bump when the steps PlayerScraper runs on a new gamelog change, older gamelogs are then rebuilt
+GAMELOG_VERSION = 2
+
+class GamelogStore(object):
+    """
+        Persistent store of parsed player gamelogs shared by every process on
+        the machine. Gamelogs are kept pickled and zlib compressed in a sqlite
+        file in WAL mode, keyed by (player_id, log_type, season), so a gamelog
+        page is only parsed once no matter how many runs, notebooks or worker
+        processes need it.
+        ...
+        Attributes
+        ----------
+        path : str
+            location of the sqlite file holding the gamelogs
+
+        max_age : float
+            seconds before a stored gamelog is parsed again (None to keep gamelogs
+            forever), for seasons that are still being played
+
+        hits : int
+            number of lookups answered from the store
+
+        misses : int
+            number of lookups that didnt find a current gamelog
+
+        Methods
+        -------
+        get(key)
+            returns the stored gamelog or None
+
+        put(key, gamelog)
+            stores a parsed gamelog
+
+        stats()
+            returns the hit/miss counters and the size of the store
+
+        clear()
+            removes every gamelog from the store
+    """
+    def __init__(self, path="./data/gamelog_store.sqlite", max_age=None):
+        """
+        Initializes the store, the sqlite file is opened on first use
+        """
+        self.path = path
+        self.max_age = max_age
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._db = SqliteConnection(path, create_gamelog_table)
+
+    def get(self, key):
+        """
+        returns the stored gamelog, or None if it isnt stored, was built by an
+        older version of the scraper or is older than max_age
+
+        Parameters
+        ----------
+        key : (str, str, int)
+            the id of the player, the log type (b or p) and the season
+        """
+        player_id, log_type, season = key
+        with self._lock:
+            row = self._connection().execute("""SELECT gamelog, version, stored FROM gamelogs
+                                                WHERE player_id = ? AND log_type = ? AND season = ?""",
+                                             (player_id, log_type, int(season))).fetchone()
+
+        if(row is None or row[1] != GAMELOG_VERSION or
+           (self.max_age is not None and time.time() - row[2] > self.max_age)):
+            self.misses += 1
+            METRICS.count("gamelog_store_misses")
+            return None
+
+        self.hits += 1
+        METRICS.count("gamelog_store_hits")
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def put(self, key, gamelog):
+        """
+        stores a parsed gamelog, replacing any older copy
+
+        Parameters
+        ----------
+        key : (str, str, int)
+            the id of the player, the log type (b or p) and the season
+
+        gamelog : Gamelog
+            the gamelog table after every ingest step and its date index
+        """
+        player_id, log_type, season = key
+        data = zlib.compress(pickle.dumps(gamelog, protocol=pickle.HIGHEST_PROTOCOL))
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("""INSERT OR REPLACE INTO gamelogs (player_id, log_type, season, gamelog, version, stored)
+                            VALUES (?, ?, ?, ?, ?, ?)""",
+                         (player_id, log_type, int(season), data, GAMELOG_VERSION, time.time()))
+            conn.commit()
+
+    def stats(self):
+        """
+        returns the store counters and the number and size of the stored gamelogs
+        """
+        with self._lock:
+            count, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(gamelog)), 0) FROM gamelogs").fetchone()
+
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "entries": count,
+                "bytes": size
+                }
+
+    def clear(self):
+        """
+        removes every gamelog from the store
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM gamelogs")
+            conn.commit()
+
+    # the sqlite connection of this process
+    def _connection(self):
+        return self._db.get()
+
+#create the gamelog table
+def create_gamelog_table(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS gamelogs (
+                        player_id TEXT NOT NULL,
+                        log_type TEXT NOT NULL,
+                        season INTEGER NOT NULL,
+                        gamelog BLOB NOT NULL,
+                        version INTEGER NOT NULL,
+                        stored REAL NOT NULL,
+                        PRIMARY KEY (player_id, log_type, season))""")
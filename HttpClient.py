@@ -0,0 +1,188 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from Metrics import METRICS, DEBUG
+
+#the statuses that are worth trying again after a pause
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket(object):
+    """
+        Token bucket rate limiter. Tokens refill at requests_per_second up to
+        burst, and every request takes one, so short bursts are allowed while
+        the sustained rate stays under the limit
+        ...
+        Attributes
+        ----------
+        requests_per_second : float
+            the sustained rate requests are started at (None for no limit)
+
+        burst : int
+            how many requests can be started at once after a quiet period
+
+        Methods
+        -------
+        acquire()
+            blocks until a token is available and takes it
+    """
+    def __init__(self, requests_per_second=1.0, burst=1):
+        """
+        Initializes the bucket full
+        """
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        blocks until a token is available and takes it
+        """
+        if(not self.requests_per_second):
+            return
+
+        while(True):
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.requests_per_second)
+                self._updated = now
+
+                if(self._tokens >= 1):
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.requests_per_second
+
+            time.sleep(wait)
+
+class HttpClient(object):
+    """
+        The http client every page request goes through. It keeps a pool of
+        keep-alive connections, throttles requests with a token bucket, retries
+        429 and 5xx responses with jittered exponential backoff and can make
+        conditional requests to revalidate a cached page.
+
+        The session and the bucket belong to one process, a forked worker opens
+        its own connections.
+        ...
+        Attributes
+        ----------
+        limiter : TokenBucket
+            throttles the requests of this process
+
+        max_retries : int
+            how many times a failed request is tried again
+
+        backoff : float
+            the pause in seconds before the first retry, it doubles after each one
+
+        max_backoff : float
+            the longest pause between retries
+
+        timeout : float
+            seconds to wait for the server before a request fails
+
+        Methods
+        -------
+        get(url, etag, last_modified)
+            requests a page, retrying on 429/5xx and connection errors
+    """
+    def __init__(self, requests_per_second=1.0, burst=2, max_retries=5, backoff=2.0, max_backoff=120.0,
+                 pool_size=8, timeout=30.0):
+        """
+        Initializes the limiter, the session is opened on first use
+        """
+        self.limiter = TokenBucket(requests_per_second, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self, url:str, etag=None, last_modified=None):
+        """
+        requests a page. 429 and 5xx responses and connection errors are retried
+        after a pause, honouring the Retry-After header when the server sends one
+
+        Parameters
+        ----------
+        url : str
+            the url of the page
+
+        etag : str
+            the ETag of the cached copy, sent as If-None-Match
+
+        last_modified : str
+            the Last-Modified of the cached copy, sent as If-Modified-Since
+
+        Returns
+        -------
+        response : requests.Response
+            a successful response, or a 304 when the cached copy is still current
+
+        Raises
+        ------
+        requests.HTTPError
+            the server returned an error status, or kept failing after every retry
+        """
+        headers = {}
+        if(etag):
+            headers["If-None-Match"] = etag
+        if(last_modified):
+            headers["If-Modified-Since"] = last_modified
+
+        attempt = 0
+        while(True):
+            self.limiter.acquire()
+            try:
+                response = self._get_session().get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if(attempt >= self.max_retries):
+                    raise
+                response = None
+
+            if(response is not None and response.status_code not in RETRY_STATUSES):
+                response.raise_for_status()
+                return response
+
+            if(attempt >= self.max_retries):
+                response.raise_for_status()
+
+            pause = self._retry_pause(response, attempt)
+            METRICS.count("http_retries")
+            METRICS.log(DEBUG, "retrying ", url, " in ", round(pause, 1), " seconds")
+            time.sleep(pause)
+            attempt += 1
+
+    # how long to wait before the next attempt
+    # full jitter so workers that failed together dont retry together
+    def _retry_pause(self, response, attempt):
+        if(response is not None):
+            retry_after = response.headers.get("Retry-After", "")
+            if(retry_after.isdigit()):
+                return min(self.max_backoff, float(retry_after))
+
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    # open the session, reopening it in a forked process
+    def _get_session(self):
+        with self._lock:
+            if(self._session is None or self._pid != os.getpid()):
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+
+                self._session = session
+                self._pid = os.getpid()
+
+            return self._session
@@ -0,0 +1,173 @@
+import threading
+import time
+from contextlib import contextmanager
+
+QUIET = 0
+INFO = 1
+DEBUG = 2
+
+class Metrics(object):
+    """
+        Collects timers and counters for the stages of a run and controls how
+        much gets printed along the way.
+        ...
+        Attributes
+        ----------
+        verbosity : int
+            QUIET only prints the summary, INFO prints progress and DEBUG prints
+            every step
+
+        Methods
+        -------
+        log(level, *args)
+            prints the message if the verbosity is at least level
+
+        timer(stage)
+            context manager that adds the time spent inside it to a stage
+
+        count(name, amount)
+            adds to a counter
+
+        profile(filepath, use_pyinstrument)
+            context manager that profiles the code inside it
+
+        summary()
+            returns a table of the timers and counters
+
+        snapshot()
+            returns a copy of the timers and counters
+
+        merge(snapshot)
+            adds the timers and counters from another process
+
+        reset()
+            clears the timers and counters
+    """
+    def __init__(self, verbosity=INFO):
+        """
+        Initializes the timers and counters
+        """
+        self.verbosity = verbosity
+        self.timers = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def log(self, level, *args):
+        """
+        prints the message if the verbosity is at least level
+
+        Parameters
+        ----------
+        level : int
+            INFO for progress messages or DEBUG for messages from hot loops
+        """
+        if(self.verbosity >= level):
+            print(*args)
+
+    @contextmanager
+    def timer(self, stage:str):
+        """
+        adds the time spent inside the with block to the stage
+
+        Parameters
+        ----------
+        stage : str
+            the name of the stage, like fetch or html_parse
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                calls, total, longest = self.timers.get(stage, (0, 0.0, 0.0))
+                self.timers[stage] = (calls + 1, total + elapsed, max(longest, elapsed))
+
+    def count(self, name:str, amount=1):
+        """
+        adds amount to the counter
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def profile(self, filepath=None, use_pyinstrument=False):
+        """
+        profiles the code inside the with block with cProfile, or pyinstrument if
+        it is installed and asked for. the report is printed, and the cProfile
+        stats are also saved to filepath if one is given
+        """
+        if(use_pyinstrument):
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                self.log(QUIET, "pyinstrument is not installed... using cProfile")
+            else:
+                profiler = Profiler()
+                profiler.start()
+                try:
+                    yield
+                finally:
+                    profiler.stop()
+                    print(profiler.output_text(unicode=True))
+                return
+
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            if(filepath is not None):
+                profiler.dump_stats(filepath)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+    def summary(self):
+        """
+        returns a table of the timers, slowest stage first, and the counters
+        """
+        lines = ["{:<24}{:>10}{:>12}{:>12}{:>12}".format("stage", "calls", "total (s)", "mean (ms)", "max (ms)")]
+        for stage, (calls, total, longest) in sorted(self.timers.items(), key=lambda t: -t[1][1]):
+            lines.append("{:<24}{:>10}{:>12.2f}{:>12.2f}{:>12.2f}".format(stage, calls, total, total / calls * 1000, longest * 1000))
+
+        if(self.counters):
+            lines.append("")
+            lines.append("{:<24}{:>10}".format("counter", "value"))
+            for name, value in sorted(self.counters.items()):
+                lines.append("{:<24}{:>10}".format(name, value))
+
+        return "\n".join(lines)
+
+    def snapshot(self):
+        """
+        returns a copy of the timers and counters that can be sent back from a
+        worker process and merged into the parent
+        """
+        with self._lock:
+            return {"timers": dict(self.timers), "counters": dict(self.counters)}
+
+    def merge(self, snapshot):
+        """
+        adds the timers and counters of a snapshot to these ones
+        """
+        with self._lock:
+            for stage, (calls, total, longest) in snapshot["timers"].items():
+                old_calls, old_total, old_longest = self.timers.get(stage, (0, 0.0, 0.0))
+                self.timers[stage] = (old_calls + calls, old_total + total, max(old_longest, longest))
+
+            for name, value in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        """
+        clears the timers and counters
+        """
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+
+#the metrics shared by the whole run
+METRICS = Metrics()
@@ -0,0 +1,362 @@
+import os
+import threading
+import time
+import zlib
+
+from HttpClient import HttpClient
+from Metrics import METRICS
+from SqliteConnection import SqliteConnection
+
+class PageCache(object):
+    """
+        Persistent, compressed cache of web pages keyed by url. Pages are stored
+        zlib compressed in a sqlite file so they survive between runs, along with
+        their ETag and Last-Modified headers so a stale page can be revalidated
+        instead of downloaded again.
+        ...
+        Attributes
+        ----------
+        path : str
+            location of the sqlite file holding the pages
+
+        max_bytes : int
+            upper bound on the total compressed size of the cache (None for no limit)
+
+        max_entries : int
+            upper bound on the number of cached pages (None for no limit)
+
+        claim_timeout : float
+            seconds before another process' claim on a url is treated as abandoned
+
+        offline : bool
+            never go to the network, a page missing from the cache is an error
+
+        max_age : float
+            seconds before a cached page is revalidated with the server (None to
+            keep pages forever)
+
+        access_interval : float
+            seconds between writes of the access times of cached pages. the times
+            are only used to pick pages to evict, so reads dont take the write
+            lock on every hit
+
+        http_client : HttpClient
+            the client pages are requested with
+
+        hits : int
+            number of fetches answered from the cache
+
+        misses : int
+            number of fetches that went to the network
+
+        evictions : int
+            number of pages removed to stay under the limits
+
+        Methods
+        -------
+        fetch(url)
+            returns the content of the page, only going to the network on a miss
+
+        get(url)
+            returns the cached content of a page or None
+
+        put(url, content, etag, last_modified)
+            compresses and stores the content of a page
+
+        stats()
+            returns the hit/miss/eviction counters and the size of the cache
+
+        urls()
+            returns the urls of every cached page
+
+        clear()
+            removes every page from the cache
+    """
+    def __init__(self, path="./data/page_cache.sqlite", max_bytes=2 * 1024**3, max_entries=None, claim_timeout=60,
+                 offline=False, max_age=None, http_client=None, access_interval=30.0):
+        """
+        Initializes the cache, the sqlite file is opened on first use and a
+        default http client is used if none is given
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.claim_timeout = claim_timeout
+        self.offline = offline
+        self.max_age = max_age
+        self.access_interval = access_interval
+        self.http_client = http_client if http_client is not None else HttpClient()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._db = SqliteConnection(path, create_page_tables)
+
+        #access times waiting to be written, keyed by url
+        self._accessed = {}
+        self._flushed = time.monotonic()
+
+################################################################################
+### PAGE ACCESS ################################################################
+    # get the page from the cache or the network
+    def fetch(self, url:str):
+        """
+        returns the content of a page, the network is only used when the page
+        is not in the cache or is older than max_age. a stale page is revalidated
+        with a conditional request and only downloaded again if it changed. the
+        cache can be shared by many processes, if another process is already
+        fetching the page this waits for it instead of downloading it again
+
+        Parameters
+        ----------
+        url : str
+            the url of the page
+
+        Returns
+        -------
+        content : bytes
+            the raw content of the page
+
+        Raises
+        ------
+        requests.HTTPError
+            the page couldnt be fetched, nothing is cached for it
+        """
+        entry = self._lookup(url)
+        if(entry is not None and (self.offline or self._is_fresh(entry))):
+            self.hits += 1
+            METRICS.count("page_cache_hits")
+            return zlib.decompress(entry[0])
+
+        if(self.offline):
+            raise KeyError("{} is not in the page cache and the cache is offline".format(url))
+
+        #wait for the page if another process is fetching it
+        if(not self._claim(url)):
+            content = self._wait_for(url)
+            if(content is not None):
+                self.hits += 1
+                METRICS.count("page_cache_hits")
+                return content
+
+        self.misses += 1
+        METRICS.count("page_cache_misses")
+        try:
+            etag, last_modified = (entry[2], entry[3]) if entry is not None else (None, None)
+            with METRICS.timer("fetch"):
+                response = self.http_client.get(url, etag, last_modified)
+
+            #the cached copy is still current
+            if(response.status_code == 304):
+                METRICS.count("page_cache_revalidated")
+                self._touch(url)
+                return zlib.decompress(entry[0])
+
+            self.put(url, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        finally:
+            self._release(url)
+
+        return response.content
+
+    # get the page from the cache
+    def get(self, url:str):
+        """
+        returns the cached content of a page or None if the page isnt cached
+        or needs revalidating
+
+        Parameters
+        ----------
+        url : str
+            the url of the page
+        """
+        entry = self._lookup(url)
+        if(entry is None or not self._is_fresh(entry)):
+            return None
+
+        return zlib.decompress(entry[0])
+
+    # get the compressed content, fetch time and validators of a cached page
+    def _lookup(self, url):
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT content, fetched, etag, last_modified FROM pages WHERE url = ?",
+                               (url,)).fetchone()
+            if(row is None):
+                return None
+
+            self._accessed[url] = time.time()
+            if(time.monotonic() - self._flushed >= self.access_interval):
+                self._flush_accessed(conn)
+                conn.commit()
+
+        return row
+
+    # write the pending access times in one transaction
+    def _flush_accessed(self, conn):
+        if(self._accessed):
+            conn.executemany("UPDATE pages SET accessed = ? WHERE url = ?",
+                             [(accessed, url) for url, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+        self._flushed = time.monotonic()
+
+    # check if a looked up page is young enough to use without revalidating
+    def _is_fresh(self, entry):
+        return self.max_age is None or time.time() - entry[1] < self.max_age
+
+    # mark a revalidated page as freshly fetched
+    def _touch(self, url):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE pages SET fetched = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+
+    # add a page to the cache
+    def put(self, url:str, content:bytes, etag=None, last_modified=None):
+        """
+        compresses and stores the content of a page, evicting the least recently
+        used pages when the cache is over its limits
+
+        Parameters
+        ----------
+        url : str
+            the url of the page
+
+        content : bytes
+            the raw content of the page
+
+        etag : str
+            the ETag header of the response, used to revalidate the page
+
+        last_modified : str
+            the Last-Modified header of the response, used to revalidate the page
+        """
+        compressed = zlib.compress(content)
+        now = time.time()
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("""INSERT OR REPLACE INTO pages (url, content, size, fetched, accessed, etag, last_modified)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                         (url, compressed, len(compressed), now, now, etag, last_modified))
+            self._accessed.pop(url, None)
+
+            #evict with the latest access times
+            self._flush_accessed(conn)
+            self._evict(conn)
+            conn.commit()
+
+################################################################################
+### FETCH CLAIMS ###############################################################
+    # mark a url as being fetched by this process
+    # returns False if another process already claimed it
+    def _claim(self, url):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM claims WHERE claimed < ?", (now - self.claim_timeout,))
+            cursor = conn.execute("INSERT OR IGNORE INTO claims (url, pid, claimed) VALUES (?, ?, ?)",
+                                  (url, os.getpid(), now))
+            conn.commit()
+
+        return cursor.rowcount == 1
+
+    def _release(self, url):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM claims WHERE url = ? AND pid = ?", (url, os.getpid()))
+            conn.commit()
+
+    # wait until the process that claimed the url is done with it
+    def _wait_for(self, url):
+        deadline = time.time() + self.claim_timeout
+        while(time.time() < deadline):
+            content = self.get(url)
+            if(content is not None):
+                return content
+
+            with self._lock:
+                claimed = self._connection().execute("SELECT 1 FROM claims WHERE url = ?", (url,)).fetchone()
+            if(claimed is None):
+                return self.get(url)
+
+            time.sleep(0.25)
+
+        return None
+
+################################################################################
+### CACHE MANAGEMENT ###########################################################
+    # remove the least recently used pages until the cache fits its limits
+    def _evict(self, conn):
+        count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+
+        while((self.max_entries is not None and count > self.max_entries) or
+              (self.max_bytes is not None and size > self.max_bytes)):
+            url, page_size = conn.execute("SELECT url, size FROM pages ORDER BY accessed LIMIT 1").fetchone()
+            conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+
+            count -= 1
+            size -= page_size
+            self.evictions += 1
+
+    def stats(self):
+        """
+        returns the cache counters and the number and size of the cached pages
+        """
+        with self._lock:
+            count, size = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": count,
+                "bytes": size
+                }
+
+    def urls(self):
+        """
+        returns the urls of every cached page
+        """
+        with self._lock:
+            rows = self._connection().execute("SELECT url FROM pages").fetchall()
+
+        return [row[0] for row in rows]
+
+    def clear(self):
+        """
+        removes every page from the cache
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM pages")
+            conn.commit()
+            self._accessed.clear()
+
+    # the sqlite connection of this process
+    def _connection(self):
+        return self._db.get()
+
+#create the page and claim tables
+def create_page_tables(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+                        url TEXT PRIMARY KEY,
+                        content BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        fetched REAL NOT NULL,
+                        accessed REAL NOT NULL,
+                        etag TEXT,
+                        last_modified TEXT)""")
+
+    #caches made before pages were revalidated dont have the validator columns
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+    for column in ("etag", "last_modified"):
+        if(column not in columns):
+            conn.execute("ALTER TABLE pages ADD COLUMN {} TEXT".format(column))
+
+    conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)")
+    conn.execute("""CREATE TABLE IF NOT EXISTS claims (
+                        url TEXT PRIMARY KEY,
+                        pid INTEGER NOT NULL,
+                        claimed REAL NOT NULL)""")
@@ -0,0 +1,44 @@
+""" Pitching Rate Stats
+
+The rate stats of a pitcher's season totals, written once for the scraper's
+gamelog totals and the season engine's replayed totals.
+    - the totals can be scalars or numpy arrays, the rates come back the same shape
+    - a rate with no innings or batters faced gets the -1 sentinel
+"""
+import numpy as np
+
+#puts FIP on the same scale as ERA
+FIP_CONSTANT = 3.2
+
+# the rate stats of pitching totals
+def rates_from_totals(BF, outs, H, HR, BB, HBP, SO, ER=None):
+    """ Calculates the rate stats of pitching totals
+
+    Parameters
+    ----------
+    BF, outs, H, HR, BB, HBP, SO : int or array
+        the batters faced, outs, hits, home runs, walks, hit batters and
+        strikeouts
+
+    ER : int or array
+        the earned runs, the ERA is only calculated when they are given
+
+    Returns
+    -------
+    rates : Dict[str, array]
+        the ERA (when ER is given), FIP, WHIP, KO_perc and BB_perc
+    """
+    BF, outs, H, HR, BB, HBP, SO = (np.asarray(total, dtype=np.float64) for total in (BF, outs, H, HR, BB, HBP, SO))
+    IP = outs / 3
+
+    rates = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if(ER is not None):
+            rates["ERA"] = np.where(IP > 0, 9 * np.asarray(ER, dtype=np.float64) / IP, -1.0)
+
+        rates["FIP"] = np.where(IP > 0, (13 * HR + 3 * (HBP + BB) - 2 * SO) / IP + FIP_CONSTANT, -1.0)
+        rates["WHIP"] = np.where(IP > 0, (BB + H) / IP, -1.0)
+        rates["KO_perc"] = np.where(BF > 0, SO / BF, -1.0)
+        rates["BB_perc"] = np.where(BF > 0, BB / BF, -1.0)
+
+    return rates
@@ -0,0 +1,268 @@
+""" Retrosheet Play Interpreter
+
+Counts the runs scored in each half inning of a game from its retrosheet play
+records, so the first inning total can be computed without the boxscore. It
+also breaks each play into the batting and pitching counting stats it adds.
+    - play records look like play,<inning>,<0 away|1 home>,<batter>,<count>,<pitches>,<event>
+    - the event is the basic play, then /modifiers, then .advances separated by ;
+
+The counts can be cross-checked against linescores scraped from
+baseball-reference.com
+    python PlayInterpreter.py record <event file> <linescore csv>
+    python PlayInterpreter.py check <event file> <linescore csv>
+
+tests/fixtures/ has an event file and the linescores of its games to check
+against, covering the plays whose runs are implied or negated by errors
+"""
+import csv
+import re
+import sys
+from itertools import takewhile
+from EventRecords import tokenize_game
+from GameIndex import GameIndex
+
+#an advance looks like 2-H, 1X3(25) or B-H(UR)
+ADVANCE_PATTERN = re.compile(r"^([B123])([-X])([123H])(.*)$")
+
+#an error in the parentheses of an out on the bases means the runner was safe
+ERROR_PATTERN = re.compile(r"\(\d*E\d")
+
+#plays that arent a plate appearance for the batter
+NO_PLATE_APPEARANCE_PATTERN = re.compile(r"^(NP|BK|CS|DI|OA|PB|WP|POCS|PO|SB|FLE)")
+
+#a runner put out on the bases in the basic play, like CS2(24) or PO1(13)
+BASE_OUT_PATTERN = re.compile(r"^(CS|POCS|PO)[123H](\([^)]*\))")
+
+#the counting stats a play can add, in the order play_stats returns them
+PLAY_STATS = ["PA", "AB", "H", "2B", "3B", "HR", "BB", "HBP", "SO", "SF", "outs"]
+
+# split an event into the basic play, its modifiers and its advances
+def split_event(event:str):
+    event = event.replace("!", "").replace("?", "").replace("#", "")
+    basic_play, _, advance_str = event.partition(".")
+    modifiers = basic_play.split("/")
+
+    advances = []
+    for advance in advance_str.split(";"):
+        match = ADVANCE_PATTERN.match(advance)
+        if(match is not None):
+            advances.append(match.groups())
+
+    return modifiers[0], modifiers[1:], advances
+
+# count the runs scored on a single play
+def runs_on_play(event:str):
+    """ Counts the runs scored on a retrosheet play
+
+    Parameters
+    ----------
+    event : str
+        the event field of a play record, like HR/F7.2-H;1-H
+
+    Returns
+    -------
+        the number of runs that scored on the play
+    """
+    basic_play, _, advances = split_event(event)
+
+    runs = 0
+    moved = set()
+    for runner, move, base, extra in advances:
+        moved.add(runner)
+
+        #a runner thrown out at home still scores if the out was negated by an error
+        if(base == "H" and (move == "-" or ERROR_PATTERN.search(extra))):
+            runs += 1
+
+    #the batter scoring on a home run is implied
+    if((basic_play.startswith("HR") or re.match(r"^H\d*$", basic_play)) and "B" not in moved):
+        runs += 1
+
+    #so is the runner on third stealing home
+    if("SBH" in basic_play and "3" not in moved):
+        runs += 1
+
+    #and the runner on third being safe at home on a caught stealing error
+    caught_home = re.search(r"CSH(\([^)]*\))", basic_play)
+    if(caught_home and ERROR_PATTERN.search(caught_home.group(1)) and "3" not in moved):
+        runs += 1
+
+    return runs
+
+# break a play down into the counting stats it adds
+def play_stats(event:str):
+    """ Breaks a retrosheet play down into the counting stats it adds for the
+        batter and the pitcher
+
+    Parameters
+    ----------
+    event : str
+        the event field of a play record, like 64(1)3/GDP
+
+    Returns
+    -------
+        a tuple of the stats in PLAY_STATS order
+    """
+    basic_play, modifiers, advances = split_event(event)
+    pa = ab = h = doubles = triples = hr = bb = hbp = so = sf = 0
+    batter_out = False
+    outs = 0
+
+    #the parts of a play like K+SB2 or W+PO1(13)
+    parts = basic_play.split("+")
+    batter_play = parts[0]
+
+    if(NO_PLATE_APPEARANCE_PATTERN.match(batter_play)):
+        parts = [batter_play] + parts[1:]
+        batter_play = ""
+    else:
+        parts = parts[1:]
+        pa = 1
+
+    if(pa):
+        ab = 1
+        if(batter_play.startswith("HP")):
+            hbp, ab = 1, 0
+        elif(re.match(r"^(IW|I|W)$", batter_play)):
+            bb, ab = 1, 0
+        elif(batter_play.startswith("HR") or re.match(r"^H\d*$", batter_play)):
+            h = hr = 1
+        elif(batter_play.startswith("DGR") or re.match(r"^D\d*$", batter_play)):
+            h = doubles = 1
+        elif(re.match(r"^T\d*$", batter_play)):
+            h = triples = 1
+        elif(re.match(r"^S\d*$", batter_play)):
+            h = 1
+        elif(batter_play.startswith("C")):
+            #catcher interference
+            ab = 0
+        elif(batter_play.startswith("K")):
+            so = 1
+            batter_out = True
+        elif(batter_play[:1].isdigit()):
+            #fielded outs like 63, 64(1)3 or 8(B)84(2)
+            forced = re.findall(r"\(([B123])\)", batter_play)
+            outs += len(forced)
+            batter_out = "B" in forced or batter_play[-1].isdigit()
+            if("B" in forced):
+                outs -= 1
+
+        if("SF" in modifiers):
+            sf, ab = 1, 0
+        elif("SH" in modifiers):
+            ab = 0
+
+    #runners caught stealing or picked off unless an error let them stay safe
+    for part in parts:
+        caught = BASE_OUT_PATTERN.match(part)
+        if(caught and not ERROR_PATTERN.search(caught.group(2))):
+            outs += 1
+
+    for runner, move, base, extra in advances:
+        if(runner == "B"):
+            #the batter advancing after a strikeout means the third strike was dropped
+            if(move == "-"):
+                batter_out = False
+            elif(not ERROR_PATTERN.search(extra)):
+                batter_out = True
+        elif(move == "X" and not ERROR_PATTERN.search(extra)):
+            outs += 1
+
+    if(batter_out):
+        outs += 1
+
+    return (pa, ab, h, doubles, triples, hr, bb, hbp, so, sf, outs)
+
+# count the runs for every half inning
+def runs_by_half_inning(plays):
+    """ Counts the runs scored in each half inning of a game
+
+    Parameters
+    ----------
+    plays : iterable of Play
+        the play records of a game, from GameRecords.plays or iter_plays
+
+    Returns
+    -------
+    runs : Dict[(int, str), int]
+        the runs scored keyed by (inning, team) where team is 0 for the away
+        team and 1 for the home team
+    """
+    runs = {}
+    for play in plays:
+        key = (play.inning, play.team)
+        runs[key] = runs.get(key, 0) + runs_on_play(play.event)
+
+    return runs
+
+# count the runs for the first inning
+def first_inning_runs(plays):
+    """ Counts the runs scored by each team in the first inning
+
+    Parameters
+    ----------
+    plays : iterable of Play
+        the play records of a game in order, from GameRecords.plays or
+        iter_plays. only the first inning is read
+
+    Returns
+    -------
+        a tuple of the away runs and the home runs
+    """
+    runs = runs_by_half_inning(takewhile(lambda play: play.inning == 1, plays))
+    return runs.get((1, "0"), 0), runs.get((1, "1"), 0)
+
+################################################################################
+### LINESCORE CROSS-CHECK ######################################################
+# save the scraped first inning linescores of every game in an event file
+def record_linescores(datafile:str, fixture_file:str):
+    """ Scrapes the first inning linescore of each game in an event file from
+        baseball-reference.com and saves them as a csv fixture
+    """
+    from Boxscore import Boxscore
+    from PageCache import PageCache
+
+    page_cache = PageCache()
+    with open(fixture_file, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["game_id", "away_runs", "home_runs"])
+        for game_id in GameIndex.build(datafile).game_ids():
+            away, home = Boxscore(game_id, page_cache).linescore()[:2]
+            writer.writerow([game_id, away[2], home[2]])
+
+# compare the interpreted first innings against the saved linescores
+def check_linescores(datafile:str, fixture_file:str):
+    """ Compares the first inning runs counted from the play records of an event
+        file against a csv fixture of linescores
+
+    Returns
+    -------
+        the number of games that didnt match
+    """
+    with open(fixture_file, newline='') as file:
+        linescores = {row["game_id"]: (int(row["away_runs"]), int(row["home_runs"])) for row in csv.DictReader(file)}
+
+    checked = 0
+    mismatches = 0
+    index = GameIndex.build(datafile)
+    for game_id in index.game_ids():
+        if(game_id not in linescores):
+            continue
+
+        checked += 1
+        counted = first_inning_runs(tokenize_game(index.chunk(game_id)).plays())
+        if(counted != linescores[game_id]):
+            mismatches += 1
+            print("mismatch ", game_id, " counted ", counted, " linescore ", linescores[game_id])
+    index.close()
+
+    print("checked ", checked, " games, ", mismatches, " mismatches")
+    return mismatches
+
+if __name__ == "__main__":
+    command, datafile, fixture_file = sys.argv[1:4]
+
+    if(command == "record"):
+        record_linescores(datafile, fixture_file)
+    else:
+        sys.exit(1 if check_linescores(datafile, fixture_file) else 0)
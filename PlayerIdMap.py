@@ -0,0 +1,76 @@
+import csv
+import os
+from Metrics import METRICS, INFO
+
+class PlayerIdMap(object):
+    """
+        Maps retrosheet player ids to baseball-reference.com player ids. The map
+        is loaded from a register/people csv file such as the Chadwick Bureau
+        register, which has a column for each id.
+        ...
+        Attributes
+        ----------
+        ids : Dict[str, str]
+            baseball-reference id keyed by retrosheet id
+
+        Methods
+        -------
+        from_csv(filepath, retro_column, bbref_column)
+            loads the map from a register csv file
+
+        get(retro_id)
+            returns the baseball-reference id or None if the player isnt mapped
+    """
+    def __init__(self, ids=None):
+        """
+        Initializes the map
+        """
+        self.ids = ids if ids is not None else {}
+
+    @classmethod
+    def from_csv(cls, filepath="./data/people.csv", retro_column="key_retro", bbref_column="key_bbref"):
+        """
+        loads the map from a register csv file. a missing file gives an empty map
+
+        Parameters
+        ----------
+        filepath : str
+            the register csv file
+
+        retro_column : str
+            the column holding the retrosheet ids
+
+        bbref_column : str
+            the column holding the baseball-reference ids
+        """
+        if(not os.path.exists(filepath)):
+            METRICS.log(INFO, "no player id register at ", filepath, "... lineups will be scraped")
+            return cls()
+
+        ids = {}
+        with open(filepath, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                retro_id = row[retro_column]
+                bbref_id = row[bbref_column]
+                if(retro_id and bbref_id):
+                    ids[retro_id] = bbref_id
+
+        METRICS.log(INFO, "loaded ", len(ids), " player ids from ", filepath)
+        return cls(ids)
+
+    def get(self, retro_id:str):
+        """
+        returns the baseball-reference id for a retrosheet id or None
+
+        Parameters
+        ----------
+        retro_id : str
+            the retrosheet id of the player
+        """
+        return self.ids.get(retro_id)
+
+    def __contains__(self, retro_id):
+        return retro_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
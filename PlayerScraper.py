@@ -1,46 +1,88 @@
 
-import requests
-from bs4 import BeautifulSoup
+from collections import namedtuple
+from lxml import html as lxml_html
+import numpy as np
 import pandas as pd
+from PageCache import PageCache
+from PitchingRates import rates_from_totals
+from FetchEngine import FetchEngine
+from GamelogCache import GamelogCache
+from GamelogStore import GamelogStore
+from Metrics import METRICS, DEBUG
+
+BASE_URL = "https://www.baseball-reference.com"
+GAMELOG_URL = "{}/players/gl.fcgi?id={}&t={}&year={}"
+SEASON = 2019
+
+#the gamelog column each batting stat is read from
+BATTING_COLUMNS = {"BA": "batting_avg", "OBP": "onbase_perc", "SLG": "slugging_perc", "OPS": "onbase_plus_slugging"}
 
 MONTH_DICT = {"Mar":'03',"Apr":"04", "May":"05", "Jun":"06", "Jul":"07", "Aug":"08", "Sep":"09", "Oct":"10", "Nov":"11"}
 
+#a gamelog table and the row of each game keyed by its date code. the index is
+#kept next to the table, pandas copies DataFrame.attrs into every derived frame
+Gamelog = namedtuple("Gamelog", ["table", "date_index"])
+
 class PlayerScraper(object):
     """
         Class used to scrape player data from baseball-reference.com
         ...
         Attributes
         ----------
-        cahce : Dict[str, DataFrame]
+        cache : GamelogCache
+            LRU cache of gamelogs keyed by (player_id, log_type, season)
+        store : GamelogStore
+            on disk store of parsed gamelogs shared by every process, checked
+            before a gamelog page is fetched or parsed
+        page_cache : PageCache
+            persistent cache of the fetched gamelog pages
+        fetch_engine : FetchEngine
+            fetches batches of gamelog pages concurrently
+        base_url : str
+            the site the gamelogs are fetched from
 
         Methods
         -------
-        scrape_batter_gamelog(player_id)
+        scrape_batter_gamelog(player_id, season)
             scrapes the batting log for a player from baseball-reference.com
 
-        scrape_pitcher_gamelog(player_id)
+        scrape_pitcher_gamelog(player_id, season)
             scrapes the pitching log for a pitcher from baseball-reference.com
 
-        get_batting_stats(player_id, game_date)
+        get_batting_stats(player_id, game_date, season)
             calculates the players batting stats for the a given game
 
-        get_pitching_stats(player_id, game_date)
+        get_pitching_stats(player_id, game_date, season)
             calculates the pitching stats for a pitcher given a game
 
-        update_cache(player_id, gamelog)
-            update the cache with the gamelog and player id
+        get_batting_stats_many(player_ids, game_dates, season)
+            the batting stats for many (player, game) pairs at once
+
+        get_pitching_stats_many(player_ids, game_dates, season)
+            the pitching stats for many (pitcher, game) pairs at once
+
+        prefetch_gamelogs(batter_ids, pitcher_ids, season)
+            fetches the gamelogs for a batch of players in parallel
+
+        update_cache(key, gamelog)
+            update the cache with the gamelog and its key
     """
-    def __init__(self):
+    def __init__(self, page_cache=None, fetch_engine=None, base_url=BASE_URL, gamelog_cache=None, gamelog_store=None):
         """
-        Initializes the cache
+        Initializes the cache, a default page cache, fetch engine, gamelog
+        cache and gamelog store are used if none are given
         """
-        self.cache = {}
+        self.cache = gamelog_cache if gamelog_cache is not None else GamelogCache()
+        self.store = gamelog_store if gamelog_store is not None else GamelogStore()
+        self.page_cache = page_cache if page_cache is not None else PageCache()
+        self.fetch_engine = fetch_engine if fetch_engine is not None else FetchEngine(self.page_cache)
+        self.base_url = base_url
 
 ################################################################################
 ### SCRPAING FUNCTION #########################################################
-    # will scrape a batters gamelog for the 2019 season
+    # will scrape a batters gamelog for a season
     # checks if the gamelog is in the cache first
-    def scrape_batter_gamelog(self, player_id:str):
+    def scrape_batter_gamelog(self, player_id:str, season=SEASON):
         """
         scrapes the batting gamelog for a given batter. will check for the gamelog
         is already in the cache.
@@ -49,30 +91,36 @@ class PlayerScraper(object):
         ---------
         player_id : str
             id of player for batting log to be scraped
+
+        season : int
+            the season of the gamelog
         """
-        try:
-            #check to see if the gamelog is in the cache
-            gamelog = self.cache[player_id]
-            print("found the bating gamelog in the cache...")
+        key = (player_id, "b", int(season))
 
-        except KeyError:
-            print("batting log not found in cache... scraping batting log")
+        #check to see if the gamelog is in the cache or the store
+        gamelog = self.find_gamelog(key)
+        if(gamelog is not None):
+            METRICS.log(DEBUG, "found the bating gamelog in the cache...")
+
+        else:
+            METRICS.log(DEBUG, "batting log not found in cache... scraping batting log")
 
             #the gamelog wasnt found in the cache and needs to be scraped
-            url_pattern = "https://www.baseball-reference.com/players/gl.fcgi?id={}&t=b&year=2019"
-            url = url_pattern.format(player_id)
-            gamelog = convert_gamelog_to_dataframe(url, "batting_gamelogs")
+            url = self.gamelog_url(player_id, "b", season)
+            table = convert_gamelog_to_dataframe(url, "batting_gamelogs", self.page_cache)
 
-            gamelog["date_game"] = gamelog.apply(lambda row: format_batter_date_code(row.date_game), axis=1)
+            with METRICS.timer("gamelog_build"):
+                gamelog = index_gamelog(table)
 
-            #update the cache
-            self.update_cache(player_id, gamelog)
+            #update the cache and the store
+            self.store.put(key, gamelog)
+            self.update_cache(key, gamelog)
 
         return gamelog
 
-    # will scrape a pitcher gamelog for 2019 season
+    # will scrape a pitcher gamelog for a season
     # checks if the gamelog is in cache
-    def scrape_pitcher_gamelog(self, player_id:str):
+    def scrape_pitcher_gamelog(self, player_id:str, season=SEASON):
         """
         scrapes the pitching gamelog for a given pitcher.  Will check for the gamelog is already in the cache
 
@@ -80,28 +128,86 @@ class PlayerScraper(object):
         ---------
         player_id : str
             id of player for pitching log to be scraped
+
+        season : int
+            the season of the gamelog
         """
-        try:
-            gamelog = self.cache[player_id]
-            print("found the pitching gameling in the cache...")
+        key = (player_id, "p", int(season))
 
-        except KeyError:
-            print("pitching log not found in cache... scraping pitching gamelog")
+        gamelog = self.find_gamelog(key)
+        if(gamelog is not None):
+            METRICS.log(DEBUG, "found the pitching gameling in the cache...")
 
-            url_pattern = "https://www.baseball-reference.com/players/gl.fcgi?id={}&t=p&year=2019"
-            url = url_pattern.format(player_id)
-            gamelog = convert_gamelog_to_dataframe(url, "pitching_gamelogs")
+        else:
+            METRICS.log(DEBUG, "pitching log not found in cache... scraping pitching gamelog")
+
+            url = self.gamelog_url(player_id, "p", season)
+            table = convert_gamelog_to_dataframe(url, "pitching_gamelogs", self.page_cache)
 
-            gamelog["date_game"] = gamelog.apply(lambda row: format_pitcher_date_code(row.date_game), axis=1)
+            with METRICS.timer("gamelog_build"):
+                #precompute the season totals before each game
+                table = add_pitching_totals(table)
+                gamelog = index_gamelog(table)
 
-            self.update_cache(player_id, gamelog)
+            self.store.put(key, gamelog)
+            self.update_cache(key, gamelog)
 
         return gamelog
 
+    # fetch the gamelogs for a batch of players at once
+    def prefetch_gamelogs(self, batter_ids, pitcher_ids, season=SEASON):
+        """
+        fetches the gamelogs of a batch of players in parallel through the fetch
+        engine and adds them to the cache. players already in the cache or the
+        store are skipped
+
+        Parameters
+        ----------
+        batter_ids : [str]
+            ids of the players to get batting gamelogs for
+
+        pitcher_ids : [str]
+            ids of the players to get pitching gamelogs for
+
+        season : int
+            the season of the gamelogs
+        """
+        season = int(season)
+        batter_ids = [p for p in dict.fromkeys(batter_ids) if self.find_gamelog((p, "b", season)) is None]
+        pitcher_ids = [p for p in dict.fromkeys(pitcher_ids) if self.find_gamelog((p, "p", season)) is None]
+
+        urls = ([self.gamelog_url(p, "b", season) for p in batter_ids] +
+                [self.gamelog_url(p, "p", season) for p in pitcher_ids])
+        self.fetch_engine.fetch_all(urls)
+
+        #the pages are in the page cache now so this is only parsing
+        for player_id in batter_ids:
+            self.scrape_batter_gamelog(player_id, season)
+        for player_id in pitcher_ids:
+            self.scrape_pitcher_gamelog(player_id, season)
+
+    # build the url for a players gamelog
+    def gamelog_url(self, player_id:str, log_type:str, season=SEASON):
+        """
+        returns the url of a players gamelog
+
+        Parameters
+        ----------
+        player_id : str
+            the baseball-reference id of the player
+
+        log_type : str
+            b for the batting gamelog or p for the pitching gamelog
+
+        season : int
+            the season of the gamelog
+        """
+        return GAMELOG_URL.format(self.base_url, player_id, log_type, season)
+
 ################################################################################
 ### GET PLAYER STATS FUNCTIONS #################################################
     #get the batting stats for
-    def get_batting_stats(self, player_id, game_date):
+    def get_batting_stats(self, player_id, game_date, season=SEASON):
         """
         calculates the batting stats for a batter for a given game record
 
@@ -113,28 +219,32 @@ class PlayerScraper(object):
         game_date : str
             a string witht data code for the game
 
+        season : int
+            the season of the game
+
         Returns
         ----------
         stats: Dict[str, str]
-            a dictinary with the stat as the key and the statistic as the value
+            a dictinary with the stat as the key and the statistic as the value.
+            a batter's first game of the season gets -1 for every stat
         """
-        print("getting batting stats for ", player_id)
+        METRICS.log(DEBUG, "getting batting stats for ", player_id)
 
-        gamelog = self.scrape_batter_gamelog(player_id)
+        gamelog = self.scrape_batter_gamelog(player_id, season)
 
-        prev_game_idx = gamelog["date_game"].loc[lambda x: x==game_date].index[0] - 1
+        with METRICS.timer("stats"):
+            prev_game_idx = find_game_index(gamelog, game_date) - 1
 
-        #if this causes an error we have to return null
-        prev_game_row = gamelog.iloc[prev_game_idx]
+            #there are no stats before the first game, same as get_batting_stats_many
+            if(prev_game_idx < 0):
+                return {stat: -1 for stat in BATTING_COLUMNS}
 
-        return {"BA":  prev_game_row.batting_avg,
-                "OBP": prev_game_row.onbase_perc,
-                "SLG": prev_game_row.slugging_perc,
-                "OPS": prev_game_row.onbase_plus_slugging
-                }
+            prev_game_row = gamelog.table.iloc[prev_game_idx]
+
+        return {stat: prev_game_row[column] for stat, column in BATTING_COLUMNS.items()}
 
     #get the pitching stats for the palyer_id
-    def get_pitching_stats(self, player_id, game_date):
+    def get_pitching_stats(self, player_id, game_date, season=SEASON):
         """
         calculates the pitching stats for the pitcher for a given game
 
@@ -146,174 +256,276 @@ class PlayerScraper(object):
         game_date : str
             a string with data code for the game
 
+        season : int
+            the season of the game
+
         Returns
         ----------
         stats: Dict[str, str]
-            a dictinary with the stat as the key and the statistic as the value
+            a dictinary with the stat as the key and the statistic as the value.
+            a pitcher's first game of the season gets -1 for every stat
         """
-        print("getting pitching stats for ", player_id)
-
-        gamelog = self.scrape_pitcher_gamelog(player_id)
-        game_idx = gamelog["date_game"].loc[lambda x: x==game_date].index[0]
-
-        #error check this here
-        prev_game_row = gamelog.iloc[game_idx - 1]
-
-        #get all the previous games for a pitcher
-        prev_gamelog = gamelog.iloc[:game_idx].apply(pd.to_numeric, errors="ignore")
-
-        #total some stats that we need for calculations
-        total_BB = prev_gamelog["BB"].sum()
-        total_HBP = prev_gamelog["HBP"].sum()
-        total_H = prev_gamelog["H"].sum()
-        total_IP = prev_gamelog["IP"].sum()
-        total_HR = prev_gamelog["HR"].sum()
-        total_K = prev_gamelog["SO"].sum()
-        total_BF = prev_gamelog["batters_faced"].sum()
-
-        #check if the pitcher actual has some experience
-        if(total_IP != 0):
-            FIP = calculate_fip(total_HR, total_HBP, total_BB, total_K, total_IP)
-            WHIP = (total_BB + total_H)/total_IP
-        else:
-            FIP = -1
-            WHIP = -1
+        METRICS.log(DEBUG, "getting pitching stats for ", player_id)
 
-        if(total_BF != 0):
-            k_perc = total_K/total_BF
-            bb_perc = total_BB/total_BF
-        else:
-            k_perc = -1
-            bb_perc = -1
-
-        return { "ERA": prev_game_row.earned_run_avg,
-                "FIP": FIP,
-                "WHIP": WHIP,
-                "KO_perc": k_perc,
-                "BB_perc": bb_perc,
+        gamelog = self.scrape_pitcher_gamelog(player_id, season)
+        with METRICS.timer("stats"):
+            game_idx = find_game_index(gamelog, game_date)
+
+            #there is no ERA before the first game, same as get_pitching_stats_many
+            ERA = gamelog.table.iloc[game_idx - 1].earned_run_avg if game_idx > 0 else -1
+
+            #the totals of all the previous games were computed when the gamelog was scraped
+            game_row = gamelog.table.iloc[game_idx]
+            rates = rates_from_totals(game_row.prev_batters_faced, game_row.prev_outs, game_row.prev_H, game_row.prev_HR,
+                                      game_row.prev_BB, game_row.prev_HBP, game_row.prev_SO)
+
+        return { "ERA": ERA,
+                "FIP": float(rates["FIP"]),
+                "WHIP": float(rates["WHIP"]),
+                "KO_perc": float(rates["KO_perc"]),
+                "BB_perc": float(rates["BB_perc"]),
         }
 
-################################################################################
-### CACHING FUNCTIONS ##########################################################
-    # add a new gamelog to the cache
-    # manage the size of the cache
-    def update_cache(self, player_id, gamelog):
+    # get the batting stats for a batch of (player, game) pairs
+    def get_batting_stats_many(self, player_ids, game_dates, season=SEASON):
         """
-         adds a value to the cache and removes a different value
+        calculates the batting stats for many (player, game) pairs at once. the
+        pairs are grouped by player, the missing gamelogs are fetched together
+        and each player's games are looked up in one step
 
-         Parameters
-         -----------
-         player_id : str
-            the id of the player
-        gamelog : DataFrame
-            a dataframe containing the batting/pitching gamelog of a player
+        Parameters
+        ----------
+        player_ids : [str]
+            ids of the batters
+
+        game_dates : [str]
+            the date code of the game for each batter
+
+        season : int
+            the season of the games
+
+        Returns
+        ----------
+        stats : DataFrame
+            BA, OBP, SLG and OPS columns with a row per pair in the input order.
+            a batter's first game of the season gets -1 for every stat
         """
-        print("updating the cache")
+        player_ids = list(player_ids)
+        game_dates = list(game_dates)
+        self.prefetch_gamelogs(player_ids, [], season)
 
-        if(len(self.cache) > 30): #the cache is too big and we need to remove an item
-            print("Cache size ", len(self.cache), " removing item...")
-            print(self.cache.popitem()[0]) #print the player id of the removed item
-            self.cache[player_id] = gamelog
-        else:
-            #add the gamelog to the cache
-            self.cache[player_id] = gamelog
+        stats = {stat: np.full(len(player_ids), -1.0) for stat in BATTING_COLUMNS}
+        for player_id, positions in group_positions(player_ids).items():
+            gamelog = self.scrape_batter_gamelog(player_id, season)
 
-################################################################################
-# SCRAPING FORMATING HELPERS ###################################################
+            with METRICS.timer("stats"):
+                prev_rows = find_game_indexes(gamelog, [game_dates[i] for i in positions]) - 1
+                has_prev = prev_rows >= 0
+                for stat, column in BATTING_COLUMNS.items():
+                    values = pd.to_numeric(gamelog.table[column], errors="coerce").values
+                    stats[stat][positions[has_prev]] = values[prev_rows[has_prev]]
 
-#convert the soup object to a players gamelog dataframe
-def convert_gamelog_to_dataframe(url, table_id):
-    response = requests.get(url)
-    #check the status code of the response
-    soup = BeautifulSoup(response.content, 'lxml')
-    #find the table
-    table = soup.find(id=table_id)
-    print(table_id, url)
+        return pd.DataFrame(stats)
 
-    #get the table headers and set them as columns
-    header = table.find('thead').find_all('tr')[0]
-    columns = [c["data-stat"] for c in header.find_all('th') if c['data-stat'] != 'x']
-    dataframe = pd.DataFrame(columns=columns)
+    # get the pitching stats for a batch of (pitcher, game) pairs
+    def get_pitching_stats_many(self, player_ids, game_dates, season=SEASON):
+        """
+        calculates the pitching stats for many (pitcher, game) pairs at once.
+        the pairs are grouped by pitcher, the missing gamelogs are fetched
+        together and each pitcher's games are looked up in one step
+
+        Parameters
+        ----------
+        player_ids : [str]
+            ids of the pitchers
 
-    #get the table rows
-    body = table.find('tbody')
-    games = [r for r in body.find_all('tr') if r.has_attr('id')]
+        game_dates : [str]
+            the date code of the game for each pitcher
 
-    #build each row into a dictionary and add to the dataframe
-    for g in games:
-        game_dict = create_game_dict(g)
-        dataframe = dataframe.append(game_dict, ignore_index=True)
+        season : int
+            the season of the games
 
-    return dataframe
+        Returns
+        ----------
+        stats : DataFrame
+            ERA, FIP, WHIP, KO_perc and BB_perc columns with a row per pair in
+            the input order
+        """
+        player_ids = list(player_ids)
+        game_dates = list(game_dates)
+        self.prefetch_gamelogs([], player_ids, season)
+
+        #the totals before each game and the ERA after the game before it
+        totals = {c: np.zeros(len(player_ids)) for c in ["BB", "HBP", "H", "HR", "SO", "batters_faced", "outs"]}
+        ERA = np.full(len(player_ids), -1.0)
+        for player_id, positions in group_positions(player_ids).items():
+            gamelog = self.scrape_pitcher_gamelog(player_id, season)
+
+            with METRICS.timer("stats"):
+                rows = find_game_indexes(gamelog, [game_dates[i] for i in positions])
+                for column in totals:
+                    totals[column][positions] = gamelog.table["prev_" + column].values[rows]
+
+                has_prev = rows > 0
+                era = pd.to_numeric(gamelog.table["earned_run_avg"], errors="coerce").values
+                ERA[positions[has_prev]] = era[rows[has_prev] - 1]
+
+        with METRICS.timer("stats"):
+            rates = rates_from_totals(totals["batters_faced"], totals["outs"], totals["H"], totals["HR"],
+                                      totals["BB"], totals["HBP"], totals["SO"])
+
+        return pd.DataFrame({"ERA": ERA,
+                             "FIP": rates["FIP"],
+                             "WHIP": rates["WHIP"],
+                             "KO_perc": rates["KO_perc"],
+                             "BB_perc": rates["BB_perc"],
+                             })
+
+################################################################################
+### CACHING FUNCTIONS ##########################################################
+    # find a gamelog in the cache, then in the store
+    def find_gamelog(self, key):
+        """
+         returns the gamelog from the cache, or from the store if another run
+         or process already parsed it, or None if it has to be scraped. gamelogs
+         found in the store are added to the cache
+
+         Parameters
+         -----------
+         key : (str, str, int)
+            the id of the player, the log type (b or p) and the season
+        """
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+
+        gamelog = self.store.get(key)
+        if(gamelog is not None):
+            self.update_cache(key, gamelog)
+
+        return gamelog
 
-#convert the game row html into a dictionary
-def create_game_dict(game_row):
-    game_dict = {}
+    # add a new gamelog to the cache
+    # the cache evicts the least recently used gamelogs when it is full
+    def update_cache(self, key, gamelog):
+        """
+         adds a gamelog to the cache, the least recently used gamelogs are
+         evicted if the cache is over its limits
 
-    for td in game_row.find_all('td'):
-        key = td['data-stat']
-        value = td.text
+         Parameters
+         -----------
+         key : (str, str, int)
+            the id of the player, the log type (b or p) and the season
+        gamelog : Gamelog
+            the batting/pitching gamelog table of a player and its date index
+        """
+        METRICS.log(DEBUG, "updating the cache")
+        self.cache[key] = gamelog
 
-        game_dict[key] = value
+################################################################################
+# SCRAPING FORMATING HELPERS ###################################################
 
-    return game_dict
+#fetch a players gamelog page and convert it to a dataframe
+def convert_gamelog_to_dataframe(url, table_id, page_cache):
+    content = page_cache.fetch(url)
+    METRICS.log(DEBUG, table_id, url)
 
-#format the game date to match the date code in the game id for a batter
-def format_batter_date_code(date):
-    date_lst = date.split(" ")
-    try:
-        month = MONTH_DICT[date_lst[0]]
-        day = date_lst[1]
-        game_no = '0'
+    with METRICS.timer("html_parse"):
+        return build_gamelog_table(content, table_id)
 
-        if(len(day) == 1):
-            day = '0'+day
+#build the gamelog dataframe from the html of a gamelog page in one pass
+def build_gamelog_table(content, table_id):
+    #the pages are utf-8 but dont always say so, lxml would read them as latin-1
+    if(isinstance(content, bytes)):
+        tree = lxml_html.fromstring(content, parser=lxml_html.HTMLParser(encoding="utf-8"))
+    else:
+        tree = lxml_html.fromstring(content)
+    table = tree.xpath('//table[@id=$table_id]', table_id=table_id)[0]
 
-        if(len(date_lst) == 3):
-            game_no = date_lst[2][1] #grab the number inbetween the parantheses
+    #get the table headers and set them as columns
+    columns = [c for c in table.xpath('./thead/tr[1]/th/@data-stat') if c != 'x']
 
-        date_code =  "".join([month, day, game_no])
+    #only the rows with an id are games, the rest are repeated headers
+    games = [{td.get('data-stat'): td.text_content() for td in r.xpath('./td')}
+             for r in table.xpath('./tbody/tr[@id]')]
 
-    except KeyError:
-        print(date_lst, print(date.split("\xa0")))
-        return -1
+    #build the frame once, keeping the header order
+    dataframe = pd.DataFrame(games)
+    extra_columns = [c for c in dataframe.columns if c not in columns]
+    dataframe = dataframe.reindex(columns=columns + extra_columns)
 
-    return date_code
+    return convert_numeric_columns(dataframe)
 
+#convert every column that only holds numbers into a numeric column
+def convert_numeric_columns(dataframe):
+    for column in dataframe.columns:
+        values = dataframe[column]
+        numeric = pd.to_numeric(values, errors="coerce")
 
-#format the game date to tmatch the date in the game id for a pitcher
-def format_pitcher_date_code(date):
-    date_lst = date.split("\xa0")
-    try:
-        month = MONTH_DICT[date_lst[0]]
+        #blank cells are fine but any other text keeps the column as strings
+        present = values.fillna("").astype(str).str.strip() != ""
+        if(numeric[present].notna().all()):
+            dataframe[column] = numeric
 
-        #parse the day and game number
-        if(date_lst[1].isdigit()):
-            day = date_lst[1]
-            game_no = '0'
-        else:
-            day = date_lst[1].split("(")[0]
-            game_no = date_lst[1].split("(")[1][0]
-
-        #add the zero the day if its a single digit
-        if(len(day) == 1):
-            day = '0'+day
-        date_code = "".join([month, day, game_no])
-    except KeyError:
-        print("Error in formating pitcher date code")
-        return -1
-
-    return date_code
-
-#caluclate FIP
-def calculate_fip(total_HR, total_HBP, total_BB, total_SO, total_IP) :
-    fip_hr = 13 * total_HR
-    fip_bb_hbp = 3 * (total_HBP + total_BB)
-    fip_k = 2 * total_SO
-    fip_denom = fip_hr + fip_bb_hbp - fip_k
-
-    #if the pitcher hasnt pitched return a sentinel value to mark it as a bad row
-    if(total_IP == 0):
-        return -1
-
-    return (fip_denom/total_IP) + 3.2
+    return dataframe
+
+#convert the game dates of a gamelog into the date codes used in the game ids
+#batter dates look like "Apr 3 (1)" and pitcher dates like "Apr\xa03(1)"
+def format_date_codes(dates):
+    parts = dates.str.extract(r"^\s*(\w{3})\s+(\d{1,2})\s*(?:\((\d)\))?")
+
+    month = parts[0].map(MONTH_DICT)
+    day = parts[1].str.zfill(2)
+    game_no = parts[2].fillna("0")
+
+    #rows with a month outside the season get the -1 sentinel
+    return (month + day + game_no).fillna("-1")
+
+#swap the game dates for date codes and index the rows by date code
+def index_gamelog(table):
+    table["date_game"] = format_date_codes(table["date_game"])
+    date_index = {code: idx for idx, code in enumerate(table["date_game"]) if code != "-1"}
+
+    return Gamelog(table, date_index)
+
+#find the row of a game in a gamelog by its date code
+def find_game_index(gamelog, game_date):
+    return gamelog.date_index[game_date]
+
+#find the rows of many games in a gamelog by their date codes
+def find_game_indexes(gamelog, game_dates):
+    return np.array([gamelog.date_index[game_date] for game_date in game_dates], dtype=np.int64)
+
+#group the positions of a list of ids by id, keeping the first seen order
+def group_positions(ids):
+    groups = {}
+    for position, key in enumerate(ids):
+        groups.setdefault(key, []).append(position)
+
+    return {key: np.array(positions, dtype=np.int64) for key, positions in groups.items()}
+
+#convert baseball innings notation (5.1 is 5 and 1/3 innings) into outs
+def innings_to_outs(innings):
+    innings = pd.to_numeric(innings, errors="coerce").fillna(0)
+    whole_innings = innings // 1
+    return (whole_innings * 3 + ((innings - whole_innings) * 10).round()).astype(int)
+
+#add the season totals before each game to a pitching gamelog
+def add_pitching_totals(gamelog):
+    counts = pd.DataFrame({
+        "BB": pd.to_numeric(gamelog["BB"], errors="coerce"),
+        "HBP": pd.to_numeric(gamelog["HBP"], errors="coerce"),
+        "H": pd.to_numeric(gamelog["H"], errors="coerce"),
+        "HR": pd.to_numeric(gamelog["HR"], errors="coerce"),
+        "SO": pd.to_numeric(gamelog["SO"], errors="coerce"),
+        "batters_faced": pd.to_numeric(gamelog["batters_faced"], errors="coerce"),
+    }).fillna(0).astype(int)
+    counts["outs"] = innings_to_outs(gamelog["IP"])
+
+    #the running total minus the game itself is the total of the games before it
+    prev_totals = counts.cumsum() - counts
+    for column in prev_totals.columns:
+        gamelog["prev_" + column] = prev_totals[column].values
+
+    return gamelog
@@ -0,0 +1,347 @@
+import numpy as np
+import pandas as pd
+from EventRecords import Data, Play, Substitution
+from PlayInterpreter import PLAY_STATS, play_stats
+from PitchingRates import rates_from_totals
+from Metrics import METRICS, INFO
+
+BATTING_STATS = ["PA", "AB", "H", "2B", "3B", "HR", "BB", "HBP", "SF"]
+PITCHING_STATS = ["BF", "outs", "H", "HR", "BB", "HBP", "SO", "ER"]
+
+#where each batting/pitching stat comes from in a play_stats tuple
+BATTING_FROM_PLAY = [PLAY_STATS.index(s) for s in BATTING_STATS]
+PITCHING_FROM_PLAY = [PLAY_STATS.index("PA" if s == "BF" else s) for s in PITCHING_STATS[:-1]]
+ER = PITCHING_STATS.index("ER")
+
+#game keys are YYYYMMDDn so a player's row times this plus a game key sorts by player then game
+PLAYER_SPAN = 10**10
+
+class SeasonEngine(object):
+    """
+        Replays the retrosheet event files of a season in date order, keeping
+        running batting and pitching totals for every player. The totals each
+        player had before every game they played in are kept so the stats going
+        into any game can be looked up without scraping anything.
+
+        The engine answers the same get_batting_stats/get_pitching_stats calls as
+        PlayerScraper, using retrosheet player ids, so it can stand in for the
+        scraper in an EventGame that hasnt been enriched.
+        ...
+        Attributes
+        ----------
+        season : int
+            the season being replayed
+
+        player_index : Dict[str, int]
+            the row of each player in the stat arrays
+
+        Methods
+        -------
+        replay(games)
+            replays a season of games and builds the lookup tables
+
+        get_batting_stats(player_id, game_date)
+            the batting stats of a player going into a game
+
+        get_pitching_stats(player_id, game_date)
+            the pitching stats of a player going into a game
+
+        totals_before_many(player_ids, log_type, game_keys)
+            the totals of many players going into many games at once
+
+        get_batting_stats_many(player_ids, game_dates)
+            the batting stats of many (player, game) pairs at once
+
+        get_pitching_stats_many(player_ids, game_dates)
+            the pitching stats of many (player, game) pairs at once
+    """
+    def __init__(self, season):
+        """
+        Initializes the running totals
+        """
+        self.season = int(season)
+        self.player_index = {}
+
+        self._batting = np.zeros((256, len(BATTING_STATS)), dtype=np.int32)
+        self._pitching = np.zeros((256, len(PITCHING_STATS)), dtype=np.int32)
+
+        #(player, game key, totals after the game) for every game a player is in
+        self._batting_log = []
+        self._pitching_log = []
+        self._tables = {}
+        self._search_keys = {}
+
+################################################################################
+### REPLAY #####################################################################
+    # replay a season of games in date order
+    def replay(self, games):
+        """
+        replays every game of the season and builds the lookup tables
+
+        Parameters
+        ----------
+        games : iterable of EventGame
+            the games of the season with retrosheet lineups, in any order
+
+        Returns
+        -------
+            the engine
+        """
+        for game in sorted(games, key=lambda g: game_key(g.id)):
+            self._replay_game(game)
+
+        self._tables["b"] = build_history(self._batting_log, len(self.player_index))
+        self._tables["p"] = build_history(self._pitching_log, len(self.player_index))
+        for log_type, (offsets, keys, totals) in self._tables.items():
+            players = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+            self._search_keys[log_type] = players * PLAYER_SPAN + keys
+        self._batting_log = []
+        self._pitching_log = []
+
+        METRICS.log(INFO, "replayed ", len(self.player_index), " players for the ", self.season, " season")
+        return self
+
+    # add the stats from one game to the running totals
+    def _replay_game(self, game):
+        key = game_key(game.id)
+        pitchers = {"0": game.away_pitcher, "1": game.home_pitcher}
+        batters = set()
+        pitched = set()
+
+        for record in game.typed_events():
+            kind = type(record)
+
+            if(kind is Play):
+                stats = play_stats(record.event)
+                if(not any(stats)):
+                    continue
+
+                batter = self._player(record.batter)
+                pitcher = self._player(pitchers["1" if record.team == "0" else "0"])
+                self._batting[batter] += [stats[i] for i in BATTING_FROM_PLAY]
+                self._pitching[pitcher, :ER] += [stats[i] for i in PITCHING_FROM_PLAY]
+                batters.add(batter)
+                pitched.add(pitcher)
+
+            #track the pitcher of each team through substitutions
+            elif(kind is Substitution and record.position == 1):
+                pitchers[record.team] = record.player_id
+
+            #earned runs are only given per pitcher at the end of the game
+            elif(kind is Data and record.kind == "er"):
+                pitcher = self._player(record.player_id)
+                self._pitching[pitcher, ER] += int(record.value)
+                pitched.add(pitcher)
+
+        for batter in batters:
+            self._batting_log.append((batter, key, self._batting[batter].copy()))
+        for pitcher in pitched:
+            self._pitching_log.append((pitcher, key, self._pitching[pitcher].copy()))
+
+    # get the row of a player, growing the arrays when they are full
+    def _player(self, player_id):
+        idx = self.player_index.get(player_id)
+        if(idx is None):
+            idx = len(self.player_index)
+            self.player_index[player_id] = idx
+
+            if(idx == len(self._batting)):
+                self._batting = np.concatenate([self._batting, np.zeros_like(self._batting)])
+                self._pitching = np.concatenate([self._pitching, np.zeros_like(self._pitching)])
+
+        return idx
+
+################################################################################
+### STAT LOOKUPS ###############################################################
+    # get a players totals going into a game
+    def totals_before(self, player_id:str, log_type:str, game_date:str):
+        """
+        returns a players season totals before a game, or None if the player has
+        no games before it
+
+        Parameters
+        ----------
+        player_id : str
+            the retrosheet id of the player
+
+        log_type : str
+            b for batting totals or p for pitching totals
+
+        game_date : str
+            the date code of the game (MMDDn)
+        """
+        idx = self.player_index.get(player_id)
+        if(idx is None):
+            return None
+
+        offsets, keys, totals = self._tables[log_type]
+        start, end = offsets[idx], offsets[idx + 1]
+
+        #the last game strictly before this one
+        prev = start + np.searchsorted(keys[start:end], int(str(self.season) + game_date)) - 1
+        if(prev < start):
+            return None
+
+        return totals[prev]
+
+    # get the totals of many players going into many games
+    def totals_before_many(self, player_ids, log_type:str, game_keys):
+        """
+        returns the season totals of each player before each game in one
+        vectorized search, players with no games before theirs get zeros
+
+        Parameters
+        ----------
+        player_ids : [str]
+            the retrosheet ids of the players
+
+        log_type : str
+            b for batting totals or p for pitching totals
+
+        game_keys : [int]
+            the game key (YYYYMMDDn) of the game for each player
+
+        Returns
+        -------
+        totals : ndarray
+            a row of totals per player, in the order of the stats in
+            BATTING_STATS or PITCHING_STATS
+        """
+        rows = np.array([self.player_index.get(p, -1) for p in player_ids], dtype=np.int64)
+        game_keys = np.asarray(game_keys, dtype=np.int64)
+
+        offsets, keys, totals = self._tables[log_type]
+        width = len(BATTING_STATS) if log_type == "b" else len(PITCHING_STATS)
+        result = np.zeros((len(rows), width), dtype=np.int64)
+        if(len(keys) == 0):
+            return result
+
+        #the last game of the same player strictly before each game
+        known = rows >= 0
+        safe_rows = np.where(known, rows, 0)
+        prev = np.searchsorted(self._search_keys[log_type], safe_rows * PLAYER_SPAN + game_keys) - 1
+        found = known & (prev >= offsets[safe_rows])
+
+        result[found] = totals[prev[found]]
+        return result
+
+    def get_batting_stats(self, player_id, game_date, season=None):
+        """
+        calculates the batting stats for a batter going into a game
+
+        Parameters
+        ----------
+        player_id : str
+            retrosheet id of the player
+
+        game_date : str
+            the date code of the game
+
+        season : int
+            the season of the game, it has to be the season of the engine
+
+        Returns
+        ----------
+        stats: Dict[str, float]
+            a dictinary with the stat as the key and the statistic as the value
+        """
+        check_season(self, season)
+        totals = self.totals_before(player_id, "b", game_date)
+        if(totals is None):
+            totals = np.zeros(len(BATTING_STATS), dtype=np.int32)
+
+        return {stat: float(values[0]) for stat, values in batting_rates(totals[None]).items()}
+
+    def get_pitching_stats(self, player_id, game_date, season=None):
+        """
+        calculates the pitching stats for a pitcher going into a game
+
+        Parameters
+        ----------
+        player_id : str
+            retrosheet id of the player
+
+        game_date : str
+            the date code of the game
+
+        season : int
+            the season of the game, it has to be the season of the engine
+
+        Returns
+        ----------
+        stats: Dict[str, float]
+            a dictinary with the stat as the key and the statistic as the value
+        """
+        check_season(self, season)
+        totals = self.totals_before(player_id, "p", game_date)
+        if(totals is None):
+            totals = np.zeros(len(PITCHING_STATS), dtype=np.int32)
+
+        return {stat: float(values[0]) for stat, values in pitching_rates(totals[None]).items()}
+
+    # get the batting stats for a batch of (player, game) pairs
+    def get_batting_stats_many(self, player_ids, game_dates, season=None):
+        """
+        calculates the batting stats for many (player, game) pairs at once, in
+        the same columnar form as PlayerScraper.get_batting_stats_many
+        """
+        check_season(self, season)
+        keys = [int(str(self.season) + game_date) for game_date in game_dates]
+        return pd.DataFrame(batting_rates(self.totals_before_many(player_ids, "b", keys)))
+
+    # get the pitching stats for a batch of (player, game) pairs
+    def get_pitching_stats_many(self, player_ids, game_dates, season=None):
+        """
+        calculates the pitching stats for many (player, game) pairs at once, in
+        the same columnar form as PlayerScraper.get_pitching_stats_many
+        """
+        check_season(self, season)
+        keys = [int(str(self.season) + game_date) for game_date in game_dates]
+        return pd.DataFrame(pitching_rates(self.totals_before_many(player_ids, "p", keys)))
+
+    # the engine already has every players stats
+    def prefetch_gamelogs(self, batter_ids, pitcher_ids, season=None):
+        pass
+
+#the rate stats of rows of batting totals, -1 where a rate has no denominator
+def batting_rates(totals):
+    PA, AB, H, doubles, triples, HR, BB, HBP, SF = np.asarray(totals, dtype=np.float64).T
+    on_base_chances = AB + BB + HBP + SF
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        OBP = np.where(on_base_chances > 0, (H + BB + HBP) / on_base_chances, -1.0)
+        BA = np.where(AB > 0, H / AB, -1.0)
+        SLG = np.where(AB > 0, (H + doubles + 2 * triples + 3 * HR) / AB, -1.0)
+
+    OPS = np.where(AB > 0, OBP + SLG, -1.0)
+    return {"BA": BA, "OBP": OBP, "SLG": SLG, "OPS": OPS}
+
+#the rate stats of rows of pitching totals, -1 where a rate has no denominator
+#the columns are in PITCHING_STATS order, the same order rates_from_totals takes
+def pitching_rates(totals):
+    return rates_from_totals(*np.asarray(totals, dtype=np.float64).T)
+
+#make sure a lookup is for the season the engine replayed
+def check_season(engine, season):
+    if(season is not None and int(season) != engine.season):
+        raise ValueError("the engine has the {} season, not {}".format(engine.season, season))
+
+#the sortable key of a game, YYYYMMDDn from the game id
+def game_key(game_id:str):
+    return int(game_id.strip()[3:])
+
+#pack the per game totals into arrays sorted by player then game
+#returns the offsets of each players rows, the game keys and the totals
+def build_history(log, player_count):
+    if(not log):
+        return np.zeros(player_count + 1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.int32)
+
+    players = np.array([entry[0] for entry in log], dtype=np.int32)
+    keys = np.array([entry[1] for entry in log], dtype=np.int64)
+    totals = np.stack([entry[2] for entry in log])
+
+    order = np.lexsort((keys, players))
+    players, keys, totals = players[order], keys[order], totals[order]
+    offsets = np.searchsorted(players, np.arange(player_count + 1))
+
+    return offsets, keys, totals
@@ -0,0 +1,50 @@
+import os
+import sqlite3
+
+class SqliteConnection(object):
+    """
+        A sqlite connection in WAL mode, so many processes can read the file
+        while one writes. The connection is shared by the threads of a process
+        and opened again after a fork, a sqlite connection cant cross processes.
+        ...
+        Attributes
+        ----------
+        path : str
+            location of the sqlite file, its directory is created if needed
+
+        setup : function
+            called with the new connection to create the tables, every time a
+            process opens the file
+
+        Methods
+        -------
+        get()
+            returns the connection of this process, opening it if needed
+    """
+    def __init__(self, path:str, setup=None):
+        """
+        Initializes the connection, the sqlite file is opened on first use
+        """
+        self.path = path
+        self.setup = setup
+        self._conn = None
+        self._pid = None
+
+    def get(self):
+        """
+        returns the connection of this process, opening the file and creating
+        its tables the first time and after a fork
+        """
+        if(self._conn is None or self._pid != os.getpid()):
+            directory = os.path.dirname(self.path)
+            if(directory):
+                os.makedirs(directory, exist_ok=True)
+
+            self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            if(self.setup is not None):
+                self.setup(self._conn)
+            self._conn.commit()
+            self._pid = os.getpid()
+
+        return self._conn
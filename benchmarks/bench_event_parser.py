@@ -0,0 +1,78 @@
+""" Retrosheet Record Parser Benchmark
+
+Times EventRecords.tokenize_game against the original parsers, which scanned
+every game once per record type, over full seasons of event files.
+    - event files are read from data/event_data/, or benchmarks/fixtures/events/
+      if there are none, and grouped into seasons by the first four characters
+      of their names
+    - the games are read into memory first so only the parsing is timed
+
+Usage
+    python benchmarks/bench_event_parser.py [--event-dir DIR] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from EventRecords import Starter, tokenize_game
+from GameIndex import GameIndex
+
+EVENT_DIRS = [os.path.join(ROOT, "data", "event_data"), os.path.join(ROOT, "benchmarks", "fixtures", "events")]
+
+################################################################################
+### BASELINE PARSER ############################################################
+# the original parsers, each one scanning the whole game chunk
+def legacy_parse_game_chunk(game_chunk):
+    game_id = game_chunk[0].split(",")[1].strip()
+
+    info_dict = {}
+    for row in [x for x in game_chunk if x.startswith("info")]:
+        info_dict[row.split(",")[1]] = row.split(",")[2].strip()
+
+    events = [x.strip() for x in game_chunk if x.startswith(("play", "com", "sub", "data"))]
+
+    lineups = []
+    for location in ['1', '0']:
+        lineups.append([Starter(x.split(",")[1], int(x.strip().split(",")[-2]), int(x.strip().split(",")[-1]))
+                        for x in game_chunk if x.startswith("start") and x.split(",")[3] == location])
+
+    return game_id, info_dict, events, lineups
+
+################################################################################
+### FIXTURES ###################################################################
+# read every game of every event file, grouped by season
+def load_seasons(event_dir):
+    seasons = {}
+    for filename in sorted(os.listdir(event_dir)):
+        if(not filename[:4].isdigit()):
+            continue
+
+        index = GameIndex.build(os.path.join(event_dir, filename))
+        seasons.setdefault(filename[:4], []).extend(index.chunk(game_id) for game_id in index.game_ids())
+        index.close()
+
+    return seasons
+
+################################################################################
+### MAIN #######################################################################
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="benchmark the retrosheet record parser")
+    arg_parser.add_argument("--event-dir", help="the directory of event files to parse")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    event_dir = args.event_dir or next((d for d in EVENT_DIRS if os.path.isdir(d) and os.listdir(d)), None)
+    if(event_dir is None):
+        arg_parser.error("no event files found in data/event_data or benchmarks/fixtures/events")
+
+    print("{:<10}{:>8}{:>14}{:>16}{:>14}{:>10}".format("season", "games", "legacy (ms)", "tokenizer (ms)", "us / game", "speedup"))
+    for season, chunks in load_seasons(event_dir).items():
+        legacy = min(timeit.repeat(lambda: [legacy_parse_game_chunk(c) for c in chunks], number=1, repeat=args.repeat))
+        tokenizer = min(timeit.repeat(lambda: [tokenize_game(c) for c in chunks], number=1, repeat=args.repeat))
+
+        print("{:<10}{:>8}{:>14.1f}{:>16.1f}{:>14.1f}{:>9.1f}x".format(season, len(chunks), legacy * 1000, tokenizer * 1000,
+                                                                      tokenizer / len(chunks) * 10**6, legacy / tokenizer))
@@ -0,0 +1,127 @@
+""" Gamelog Table Builder Micro-Benchmark
+
+Times PlayerScraper.build_gamelog_table against the original BeautifulSoup
+row-by-row builder on saved gamelog pages.
+    - the batting and pitching gamelog pages of the pipeline benchmark are read
+      from benchmarks/fixtures/pages/, see make_fixtures.py
+    - real pages saved in benchmarks/fixtures/gamelogs/*.html are timed too, a
+      page can be saved with
+        python benchmarks/bench_gamelog_builder.py --record <player_id> <b|p>
+
+Usage
+    python benchmarks/bench_gamelog_builder.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from bs4 import BeautifulSoup
+from PageCache import PageCache
+from PlayerScraper import PlayerScraper, build_gamelog_table
+
+FIXTURE_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "gamelogs")
+PAGE_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "pages")
+
+#the table on the gamelog page for each log type
+TABLE_IDS = {"b": "batting_gamelogs", "p": "pitching_gamelogs"}
+
+################################################################################
+### BASELINE BUILDER ###########################################################
+# the original builder, appending one row at a time to the frame
+def legacy_build_gamelog_table(content, table_id):
+    soup = BeautifulSoup(content, 'lxml')
+    table = soup.find(id=table_id)
+
+    header = table.find('thead').find_all('tr')[0]
+    columns = [c["data-stat"] for c in header.find_all('th') if c['data-stat'] != 'x']
+    dataframe = pd.DataFrame(columns=columns)
+
+    body = table.find('tbody')
+    games = [r for r in body.find_all('tr') if r.has_attr('id')]
+
+    #DataFrame.append is gone from pandas so concat one row at a time instead
+    for g in games:
+        game_dict = {td['data-stat']: td.text for td in g.find_all('td')}
+        dataframe = pd.concat([dataframe, pd.DataFrame([game_dict])], ignore_index=True)
+
+    return dataframe
+
+# the rows whose date text differs between the two builders, a page that was
+# decoded wrongly shows up here before it turns into bad date codes
+def mismatched_dates(content, table_id):
+    legacy = list(legacy_build_gamelog_table(content, table_id)["date_game"])
+    builder = list(build_gamelog_table(content, table_id)["date_game"])
+    if(len(legacy) != len(builder)):
+        return [("rows", len(legacy), len(builder))]
+
+    return [(i, a, b) for i, (a, b) in enumerate(zip(legacy, builder)) if a != b]
+
+################################################################################
+### FIXTURES ###################################################################
+# load the gamelog pages recorded for the pipeline benchmark and any saved ones
+def load_fixtures():
+    fixtures = []
+    with open(os.path.join(PAGE_DIR, "index.json")) as file:
+        index = json.load(file)
+
+    for url, filename in sorted(index.items()):
+        log_type = parse_qs(urlparse(url).query).get("t")
+        if(log_type in (["b"], ["p"])):
+            fixtures.append((filename, os.path.join(PAGE_DIR, filename), TABLE_IDS[log_type[0]]))
+
+    if(os.path.isdir(FIXTURE_DIR)):
+        for filename in sorted(os.listdir(FIXTURE_DIR)):
+            if(filename.endswith(".html")):
+                fixtures.append((filename, os.path.join(FIXTURE_DIR, filename), TABLE_IDS[filename[-6]]))
+
+    loaded = []
+    for name, filepath, table_id in fixtures:
+        with open(filepath, 'rb') as file:
+            loaded.append((name, file.read(), table_id))
+
+    return loaded
+
+# save a gamelog page as a fixture
+def record_fixture(player_id, log_type):
+    scraper = PlayerScraper(PageCache())
+    content = scraper.page_cache.fetch(scraper.gamelog_url(player_id, log_type))
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    filepath = os.path.join(FIXTURE_DIR, "{}_{}.html".format(player_id, log_type))
+    with open(filepath, 'wb') as file:
+        file.write(content)
+    print("saved ", filepath)
+
+################################################################################
+### MAIN #######################################################################
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="benchmark the gamelog table builder")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--record", nargs=2, metavar=("PLAYER_ID", "LOG_TYPE"))
+    args = arg_parser.parse_args()
+
+    if(args.record):
+        record_fixture(*args.record)
+        sys.exit()
+
+    if(not os.path.exists(os.path.join(PAGE_DIR, "index.json"))):
+        arg_parser.error("no recorded pages in " + PAGE_DIR + ", generate them with python benchmarks/make_fixtures.py")
+
+    print("{:<30}{:>8}{:>14}{:>14}{:>10}".format("fixture", "rows", "legacy (ms)", "builder (ms)", "speedup"))
+    for name, content, table_id in load_fixtures():
+        mismatches = mismatched_dates(content, table_id)
+        if(mismatches):
+            arg_parser.exit(1, "{} is built differently by the two builders: {}\n".format(name, mismatches[:3]))
+
+        rows = len(build_gamelog_table(content, table_id))
+        legacy = min(timeit.repeat(lambda: legacy_build_gamelog_table(content, table_id), number=1, repeat=args.repeat))
+        builder = min(timeit.repeat(lambda: build_gamelog_table(content, table_id), number=1, repeat=args.repeat))
+
+        print("{:<30}{:>8}{:>14.2f}{:>14.2f}{:>9.1f}x".format(name, rows, legacy * 1000, builder * 1000, legacy / builder))
@@ -0,0 +1,262 @@
+""" End to End Pipeline Benchmark
+
+Replays recorded boxscore and gamelog pages through the whole pipeline with no
+network access and reports throughput, per-stage latency and peak memory.
+    - event files are read from benchmarks/fixtures/events/
+    - recorded pages are read from benchmarks/fixtures/pages/ (index.json maps
+      each url to its file) and loaded into an offline page cache, so a page
+      that wasnt recorded is an error instead of a live request
+    - an optional player id register is read from benchmarks/fixtures/people.csv
+
+The committed fixtures are a synthetic season written by make_fixtures.py,
+regenerate them with
+    python benchmarks/make_fixtures.py
+
+Or record real pages for the event fixtures, this does go to the network
+    python benchmarks/bench_pipeline.py --record
+
+Run the benchmark and save the results for comparing commits
+    python benchmarks/bench_pipeline.py --output results.json [--offline]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import parser
+from EventGame import EventGame
+from Metrics import METRICS, QUIET
+from PageCache import PageCache
+from PlayerIdMap import PlayerIdMap
+from GamelogStore import GamelogStore
+from PlayerScraper import PlayerScraper
+
+FIXTURE_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+EVENT_DIR = os.path.join(FIXTURE_DIR, "events")
+PAGE_DIR = os.path.join(FIXTURE_DIR, "pages")
+
+################################################################################
+### STAGE TIMERS ###############################################################
+class StageTimer(object):
+    """
+        Records the latency of every call to the functions it wraps
+    """
+    def __init__(self):
+        self.latencies = {}
+        self._originals = []
+
+    # replace owner.name with a timed version of it
+    def wrap(self, owner, name, stage):
+        original = getattr(owner, name)
+        latencies = self.latencies.setdefault(stage, [])
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        self._originals.append((owner, name, original))
+        setattr(owner, name, timed)
+
+    # put the original functions back
+    def restore(self):
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals = []
+
+    def summary(self):
+        return {stage: summarize(latencies) for stage, latencies in self.latencies.items()}
+
+#the count, total and percentiles of a list of latencies in milliseconds
+def summarize(latencies):
+    if(not latencies):
+        return {"calls": 0}
+
+    ordered = sorted(latencies)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {"calls": len(ordered),
+            "total_s": sum(ordered),
+            "p50_ms": percentile(50),
+            "p90_ms": percentile(90),
+            "p99_ms": percentile(99),
+            "max_ms": ordered[-1] * 1000
+            }
+
+################################################################################
+### FIXTURES ###################################################################
+# make sure the event files, and the recorded pages if they are needed, exist
+def check_fixtures(need_pages=True):
+    if(not os.path.isdir(EVENT_DIR) or not os.listdir(EVENT_DIR)):
+        missing = "no event files in " + EVENT_DIR
+    elif(need_pages and not os.path.exists(os.path.join(PAGE_DIR, "index.json"))):
+        missing = "no recorded pages in " + PAGE_DIR
+    else:
+        return
+
+    raise FileNotFoundError(missing + ", generate them with python benchmarks/make_fixtures.py")
+
+# point the parser at a page cache, scraper and id map for the benchmark
+def use_page_cache(page_cache):
+    parser.PAGE_CACHE = page_cache
+    #a store next to the page cache so runs dont read gamelogs parsed by earlier ones
+    gamelog_store = GamelogStore(os.path.join(os.path.dirname(page_cache.path), "gamelogs.sqlite"))
+    parser.PLAYER_SCRAPER = PlayerScraper(page_cache, gamelog_store=gamelog_store)
+
+    people = os.path.join(FIXTURE_DIR, "people.csv")
+    parser.ID_MAP = PlayerIdMap.from_csv(people) if os.path.exists(people) else PlayerIdMap()
+
+# load the recorded pages into an offline page cache
+def load_page_fixtures(cache_path):
+    page_cache = PageCache(cache_path, max_bytes=None)
+    with open(os.path.join(PAGE_DIR, "index.json")) as file:
+        index = json.load(file)
+
+    for url, filename in index.items():
+        with open(os.path.join(PAGE_DIR, filename), 'rb') as file:
+            page_cache.put(url, file.read())
+
+    page_cache.offline = True
+    return page_cache
+
+# run the pipeline live and save every page it fetched
+def record_page_fixtures():
+    check_fixtures(need_pages=False)
+    workdir = tempfile.mkdtemp()
+    try:
+        page_cache = PageCache(os.path.join(workdir, "pages.sqlite"), max_bytes=None)
+        use_page_cache(page_cache)
+        for filename in sorted(os.listdir(EVENT_DIR)):
+            for game in parser.chunk_games(os.path.join(EVENT_DIR, filename)):
+                game.create_dataset_record()
+
+        os.makedirs(PAGE_DIR, exist_ok=True)
+        index = {}
+        for number, url in enumerate(sorted(page_cache.urls())):
+            filename = "page_{:05d}.html".format(number)
+            with open(os.path.join(PAGE_DIR, filename), 'wb') as file:
+                file.write(page_cache.get(url))
+            index[url] = filename
+
+        with open(os.path.join(PAGE_DIR, "index.json"), 'w') as file:
+            json.dump(index, file, indent=1)
+        print("recorded ", len(index), " pages to ", PAGE_DIR)
+    finally:
+        shutil.rmtree(workdir)
+
+################################################################################
+### BENCHMARK ##################################################################
+# time each stage of the pipeline over the event fixtures
+def run_benchmark(offline=False):
+    check_fixtures(need_pages=not offline)
+    event_files = [os.path.join(EVENT_DIR, f) for f in sorted(os.listdir(EVENT_DIR))]
+    workdir = tempfile.mkdtemp()
+    results = {"offline": offline, "event_files": len(event_files)}
+
+    #only the summary is printed, and the counters start from zero
+    METRICS.verbosity = QUIET
+    METRICS.reset()
+
+    try:
+        if(not offline):
+            use_page_cache(load_page_fixtures(os.path.join(workdir, "pages.sqlite")))
+
+        #parsing and enrichment
+        timer = StageTimer()
+        timer.wrap(parser, "parse_game_chunk", "parse_game")
+        timer.wrap(parser, "enrich_game", "enrich_game")
+        start = time.perf_counter()
+        if(offline):
+            season = os.path.basename(event_files[0])[:4]
+            engine = parser.build_season_engine(season, event_files)
+            games = [g for f in event_files for g in parser.iter_games(f, engine)]
+        else:
+            games = [g for f in event_files for g in parser.chunk_games(f)]
+        results["chunk_games_s"] = time.perf_counter() - start
+        timer.restore()
+
+        #building the dataset records
+        timer.wrap(EventGame, "create_dataset_record", "create_dataset_record")
+        timer.wrap(EventGame, "get_first_inning_total", "first_inning_total")
+        start = time.perf_counter()
+        for game in games:
+            game.create_dataset_record()
+        records_time = time.perf_counter() - start
+        timer.restore()
+
+        results["games"] = len(games)
+        results["records_s"] = records_time
+        results["records_games_per_s"] = len(games) / records_time if records_time else None
+
+        #the whole run, from event files to csv files
+        run_dir = os.path.join(workdir, "run")
+        os.makedirs(os.path.join(run_dir, "data", "csv_data"))
+        shutil.copytree(EVENT_DIR, os.path.join(run_dir, "data", "event_data"))
+
+        #start the run with a cold gamelog cache
+        if(not offline):
+            use_page_cache(parser.PAGE_CACHE)
+
+        cwd = os.getcwd()
+        os.chdir(run_dir)
+        try:
+            start = time.perf_counter()
+            parser.scrape_all_files(offline=offline)
+            end_to_end = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+        results["end_to_end_s"] = end_to_end
+        results["end_to_end_games_per_s"] = len(games) / end_to_end if end_to_end else None
+        results["stages"] = timer.summary()
+        results["metrics"] = METRICS.snapshot()
+        results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    finally:
+        shutil.rmtree(workdir)
+
+    return results
+
+# the commit the benchmark ran on
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+################################################################################
+### MAIN #######################################################################
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="benchmark the dataset pipeline on recorded fixtures")
+    arg_parser.add_argument("--record", action="store_true", help="record the pages for the event fixtures")
+    arg_parser.add_argument("--offline", action="store_true", help="take the player stats from the event files")
+    arg_parser.add_argument("--output", help="write the results to this json file")
+    args = arg_parser.parse_args()
+
+    try:
+        check_fixtures(need_pages=not (args.record or args.offline))
+    except FileNotFoundError as error:
+        arg_parser.error(str(error))
+
+    if(args.record):
+        record_page_fixtures()
+        sys.exit()
+
+    results = run_benchmark(args.offline)
+    results["commit"] = git_commit()
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if(args.output):
+        with open(args.output, 'w') as file:
+            file.write(report)
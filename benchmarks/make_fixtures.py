@@ -0,0 +1,346 @@
+""" Pipeline Benchmark Fixture Generator
+
+Writes a small synthetic season for bench_pipeline.py, so the benchmark runs
+without recording pages from the network first.
+    - two retrosheet event files, 2019BOS.EVA and 2019TOR.EVA, with six games
+      each, to benchmarks/fixtures/events/
+    - the baseball-reference boxscore and gamelog pages those games need, with
+      index.json mapping each url to its file, to benchmarks/fixtures/pages/
+    - the games are simulated play by play, so the gamelogs, linescores and
+      earned runs all agree with the event files
+
+The output only depends on the seed
+    python benchmarks/make_fixtures.py [--seed N]
+"""
+import argparse
+import json
+import os
+import random
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(ROOT, "fixtures")
+EVENT_DIR = os.path.join(FIXTURE_DIR, "events")
+PAGE_DIR = os.path.join(FIXTURE_DIR, "pages")
+
+BASE_URL = "https://www.baseball-reference.com"
+SEASON = 2019
+MONTHS = {4: "Apr", 5: "May"}
+
+#(home team, away team, first day of the series in April)
+SERIES = [("BOS", "TOR", 9), ("TOR", "BOS", 16)]
+GAMES_PER_SERIES = 6
+
+FIRST_NAMES = ["Aaron", "Brian", "Carlos", "Dylan", "Eddie", "Frank", "Greg", "Hunter", "Ivan", "Jose",
+               "Kevin", "Luis", "Mike", "Nick", "Oscar", "Pedro"]
+LAST_NAMES = ["Adams", "Baker", "Castro", "Davis", "Evans", "Flores", "Garcia", "Harris", "Ingram", "Jones",
+              "Keller", "Lopez", "Miller", "Nelson", "Ortiz", "Perez", "Quinn", "Reyes", "Smith", "Torres",
+              "Upton", "Vargas", "Walker", "Young", "Zimmer", "Bell", "Cruz", "Diaz"]
+
+#the plays a plate appearance can end in, and how often
+EVENTS = ["K", "63/G", "43/G", "8/F", "7/F", "W", "S8/G", "S7/L", "D7/L", "HR/F7"]
+WEIGHTS = [22, 14, 12, 12, 10, 9, 11, 6, 3, 1]
+
+################################################################################
+### PLAYERS ####################################################################
+class Player(object):
+    """
+        A simulated player with their retrosheet and baseball-reference ids and
+        their line in each game they played
+    """
+    def __init__(self, first, last, number):
+        self.name = "{} {}".format(first, last)
+        self.retro_id = "{}{}{:03d}".format(last[:4].lower(), first[0].lower(), number)
+        self.bref_id = "{}{}{:02d}".format(last[:5].lower(), first[:2].lower(), number)
+        self.games = []
+
+    # the stats of the player in the game being played
+    def line(self, date):
+        if(not self.games or self.games[-1][0] != date):
+            self.games.append((date, {}))
+
+        return self.games[-1][1]
+
+    def add(self, date, **stats):
+        line = self.line(date)
+        for stat, value in stats.items():
+            line[stat] = line.get(stat, 0) + value
+
+# make the roster of a team, 9 batters, 3 starting pitchers and a reliever
+def make_team(rng, used):
+    players = []
+    while(len(players) < 13):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        if((first, last) not in used):
+            used.add((first, last))
+            players.append(Player(first, last, 1))
+
+    return {"batters": players[:9], "starters": players[9:12], "reliever": players[12]}
+
+################################################################################
+### GAME SIMULATION ############################################################
+# simulate a half inning and add its play records
+def play_half_inning(rng, lines, inning, side, lineup, spot, pitcher, date):
+    outs = 0
+    runs = 0
+    bases = [None, None, None]
+
+    while(outs < 3):
+        batter = lineup[spot % 9]
+        spot += 1
+        event = rng.choices(EVENTS, WEIGHTS)[0]
+        advances = []
+        scored = []
+
+        batter.add(date, PA=1)
+        pitcher.add(date, BF=1)
+        if(event == "W"):
+            count, pitches = "30", "BBBB"
+            batter.add(date, BB=1)
+            pitcher.add(date, BB=1)
+
+            #only forced runners move on a walk
+            if(bases[0] is not None):
+                if(bases[1] is not None):
+                    if(bases[2] is not None):
+                        advances.append("3-H")
+                        scored.append(bases[2])
+                    advances.append("2-3")
+                    bases[2] = bases[1]
+                advances.append("1-2")
+                bases[1] = bases[0]
+            bases[0] = batter
+
+        elif(event[0] in "SDH"):
+            count, pitches = "11", "BCX"
+            bases_moved = {"S": 1, "D": 2, "H": 4}[event[0]]
+            batter.add(date, AB=1, H=1, **({"2B": 1} if event[0] == "D" else {}), **({"HR": 1} if event[0] == "H" else {}))
+            pitcher.add(date, H=1, **({"HR": 1} if event[0] == "H" else {}))
+
+            new_bases = [None, None, None]
+            for base in [2, 1, 0]:
+                runner = bases[base]
+                if(runner is None):
+                    continue
+
+                target = base + bases_moved
+                if(target >= 3):
+                    advances.append("{}-H".format(base + 1))
+                    scored.append(runner)
+                else:
+                    advances.append("{}-{}".format(base + 1, target + 1))
+                    new_bases[target] = runner
+
+            #the batter scoring on a home run is implied
+            if(event[0] == "H"):
+                scored.append(batter)
+            else:
+                new_bases[bases_moved - 1] = batter
+            bases = new_bases
+
+        else:
+            count, pitches = ("02", "CSS") if event == "K" else ("01", "CX")
+            batter.add(date, AB=1, **({"SO": 1} if event == "K" else {}))
+            pitcher.add(date, outs=1, **({"SO": 1} if event == "K" else {}))
+            outs += 1
+
+        for runner in scored:
+            runner.add(date, R=1)
+        runs += len(scored)
+        pitcher.add(date, ER=len(scored))
+
+        play = event + ("." + ";".join(advances) if advances else "")
+        lines.append("play,{},{},{},{},{},{}".format(inning, side, batter.retro_id, count, pitches, play))
+
+    return runs, spot
+
+# simulate a game and return its lines and linescore
+def play_game(rng, game_id, date, home_team, away_team, home, away, game_number):
+    lines = ["id," + game_id,
+             "version,2",
+             "info,visteam," + away_team,
+             "info,hometeam," + home_team,
+             "info,site,{}07".format(home_team),
+             "info,date,{}/{:02d}/{:02d}".format(SEASON, date[0], date[1]),
+             "info,number,0",
+             "info,daynight,night",
+             "info,usedh,true",
+             "info,temp,{}".format(rng.randint(40, 75)),
+             "info,winddir," + rng.choice(["ltor", "rtol", "tolf", "tocf", "torf", "fromcf"]),
+             "info,windspeed,{}".format(rng.randint(0, 20))]
+
+    pitchers = {}
+    for side, team in [("0", away), ("1", home)]:
+        for order, batter in enumerate(team["batters"], 1):
+            lines.append('start,{},"{}",{},{},{}'.format(batter.retro_id, batter.name, side, order, order + 1 if order < 9 else 10))
+
+        pitchers[side] = team["starters"][game_number % 3]
+        lines.append('start,{},"{}",{},0,1'.format(pitchers[side].retro_id, pitchers[side].name, side))
+
+    linescore = {"0": [], "1": []}
+    spots = {"0": 0, "1": 0}
+    for inning in range(1, 10):
+        for side, team in [("0", away), ("1", home)]:
+            #the home team doesnt bat in the ninth when it is ahead
+            if(inning == 9 and side == "1" and sum(linescore["1"]) > sum(linescore["0"])):
+                linescore["1"].append("X")
+                break
+
+            #the fielding team goes to its reliever in the seventh
+            fielding = "1" if side == "0" else "0"
+            if(inning == 7):
+                reliever = (home if fielding == "1" else away)["reliever"]
+                if(pitchers[fielding] is not reliever):
+                    pitchers[fielding] = reliever
+                    lines.append('sub,{},"{}",{},0,1'.format(reliever.retro_id, reliever.name, fielding))
+
+            runs, spots[side] = play_half_inning(rng, lines, inning, side, team["batters"], spots[side],
+                                                 pitchers[fielding], date)
+            linescore[side].append(runs)
+
+    #every run is earned in the simulation
+    for side, team in [("0", away), ("1", home)]:
+        for pitcher in [team["starters"][game_number % 3], team["reliever"]]:
+            if(pitcher.games and pitcher.games[-1][0] == date):
+                lines.append("data,er,{},{}".format(pitcher.retro_id, pitcher.games[-1][1].get("ER", 0)))
+
+    return lines, linescore
+
+################################################################################
+### PAGES ######################################################################
+# the boxscore page with the linescore and the lineups hidden in a comment
+def boxscore_page(home_team, away_team, home, away, game_number, linescore):
+    rows = []
+    for side, team_id in [("0", away_team), ("1", home_team)]:
+        cells = "".join("<td>{}</td>".format(runs) for runs in linescore[side])
+        total = sum(r for r in linescore[side] if r != "X")
+        rows.append('<tr><td></td><td><a href="/teams/{0}/{1}.shtml">{0}</a></td>{2}<td>{3}</td></tr>'.format(team_id, SEASON, cells, total))
+
+    lineups = []
+    for number, team in [(1, away), (2, home)]:
+        players = team["batters"] + [team["starters"][game_number % 3]]
+        cells = "".join('<tr><td>{}</td><td><a href="/players/{}/{}.shtml">{}</a></td></tr>'.format(
+            order, player.bref_id[0], player.bref_id, player.name) for order, player in enumerate(players, 1))
+        lineups.append('<table id="lineups_{}"><tbody>{}</tbody></table>'.format(number, cells))
+
+    return ('<html><head><meta charset="utf-8"></head><body><div class="linescore_wrap"><table class="linescore"><tbody>{}</tbody></table></div>'
+            '<div id="all_lineups"><!--\n<div id="div_lineups">{}</div>\n--></div></body></html>').format(
+                "".join(rows), "".join(lineups))
+
+# a rate formatted the way baseball-reference shows it
+def rate(numerator, denominator, digits=3):
+    if(not denominator):
+        return ""
+
+    text = "{:.{}f}".format(numerator / denominator, digits)
+    return text[1:] if text.startswith("0.") else text
+
+# the batting gamelog page of a player
+def batting_gamelog_page(player, team_id, opponents):
+    columns = ["team_ID", "opp_ID", "PA", "AB", "R", "H", "2B", "3B", "HR", "BB", "HBP", "SO",
+               "batting_avg", "onbase_perc", "slugging_perc", "onbase_plus_slugging"]
+
+    rows = []
+    totals = {}
+    for number, (date, line) in enumerate(player.games, 1):
+        for stat, value in line.items():
+            totals[stat] = totals.get(stat, 0) + value
+
+        AB, H, BB = totals.get("AB", 0), totals.get("H", 0), totals.get("BB", 0)
+        bases = H + totals.get("2B", 0) + 3 * totals.get("HR", 0)
+        OBP = (H + BB) / (AB + BB) if AB + BB else 0
+        SLG = bases / AB if AB else 0
+        values = [team_id, opponents[date]] + [line.get(s, 0) for s in ["PA", "AB", "R", "H", "2B", "3B", "HR", "BB", "HBP", "SO"]]
+        values += [rate(H, AB), rate(H + BB, AB + BB), rate(bases, AB), rate(OBP + SLG, 1) if AB else ""]
+
+        rows.append(gamelog_row("batting_gamelogs", number, "{} {}".format(MONTHS[date[0]], date[1]), columns, values))
+
+    return gamelog_page("batting_gamelogs", columns, rows)
+
+# the pitching gamelog page of a player
+def pitching_gamelog_page(player, team_id, opponents):
+    columns = ["team_ID", "opp_ID", "IP", "H", "R", "ER", "BB", "SO", "HR", "HBP", "earned_run_avg", "batters_faced"]
+
+    rows = []
+    outs = ER = 0
+    for number, (date, line) in enumerate(player.games, 1):
+        outs += line.get("outs", 0)
+        ER += line.get("ER", 0)
+
+        IP = "{}.{}".format(line.get("outs", 0) // 3, line.get("outs", 0) % 3)
+        values = [team_id, opponents[date], IP, line.get("H", 0), line.get("ER", 0), line.get("ER", 0), line.get("BB", 0),
+                  line.get("SO", 0), line.get("HR", 0), 0, "{:.2f}".format(27 * ER / outs) if outs else "inf", line.get("BF", 0)]
+
+        #baseball-reference puts a non breaking space in the pitching dates
+        rows.append(gamelog_row("pitching_gamelogs", number, "{}\xa0{}".format(MONTHS[date[0]], date[1]), columns, values))
+
+    return gamelog_page("pitching_gamelogs", columns, rows)
+
+def gamelog_row(table_id, number, date, columns, values):
+    cells = "".join('<td data-stat="{}">{}</td>'.format(c, v) for c, v in zip(columns, values))
+    return '<tr id="{}.{}"><th data-stat="ranker">{}</th><td data-stat="date_game">{}</td>{}</tr>'.format(
+        table_id, number, number, date, cells)
+
+def gamelog_page(table_id, columns, rows):
+    header = "".join('<th data-stat="{0}">{0}</th>'.format(c) for c in ["ranker", "date_game"] + columns)
+    return ('<html><head><meta charset="utf-8"></head><body><table id="{}"><thead><tr>{}</tr></thead><tbody>{}</tbody></table></body></html>').format(
+        table_id, header, "".join(rows))
+
+################################################################################
+### MAIN #######################################################################
+# simulate the season and write the event files and pages
+def make_fixtures(seed=2019):
+    rng = random.Random(seed)
+    used = set()
+    teams = {team_id: make_team(rng, used) for team_id in sorted(set(t for s in SERIES for t in s[:2]))}
+    opponents = {team_id: {} for team_id in teams}
+
+    event_files = {}
+    pages = {}
+    game_number = 0
+    for home_team, away_team, first_day in SERIES:
+        home, away = teams[home_team], teams[away_team]
+        lines = []
+        for day in range(first_day, first_day + GAMES_PER_SERIES):
+            date = (4, day)
+            game_id = "{}{}{:02d}{:02d}0".format(home_team, SEASON, date[0], date[1])
+            opponents[home_team][date] = away_team
+            opponents[away_team][date] = home_team
+
+            game_lines, linescore = play_game(rng, game_id, date, home_team, away_team, home, away, game_number)
+            lines += game_lines
+            pages["{}/boxes/{}/{}.shtml".format(BASE_URL, home_team, game_id)] = (
+                "boxscore_{}.html".format(game_id), boxscore_page(home_team, away_team, home, away, game_number, linescore))
+            game_number += 1
+
+        event_files["{}{}.EVA".format(SEASON, home_team)] = lines
+
+    #the dataset only needs the gamelogs of the top of the order and the starters
+    for team_id, team in teams.items():
+        for batter in team["batters"][:3]:
+            url = "{}/players/gl.fcgi?id={}&t=b&year={}".format(BASE_URL, batter.bref_id, SEASON)
+            pages[url] = ("gamelog_b_{}.html".format(batter.bref_id), batting_gamelog_page(batter, team_id, opponents[team_id]))
+        for starter in team["starters"]:
+            url = "{}/players/gl.fcgi?id={}&t=p&year={}".format(BASE_URL, starter.bref_id, SEASON)
+            pages[url] = ("gamelog_p_{}.html".format(starter.bref_id), pitching_gamelog_page(starter, team_id, opponents[team_id]))
+
+    os.makedirs(EVENT_DIR, exist_ok=True)
+    for filename, lines in event_files.items():
+        with open(os.path.join(EVENT_DIR, filename), 'w', newline='') as file:
+            file.write("\r\n".join(lines) + "\r\n")
+
+    os.makedirs(PAGE_DIR, exist_ok=True)
+    for filename, content in pages.values():
+        with open(os.path.join(PAGE_DIR, filename), 'w', encoding="utf-8") as file:
+            file.write(content)
+
+    with open(os.path.join(PAGE_DIR, "index.json"), 'w') as file:
+        json.dump({url: filename for url, (filename, _) in sorted(pages.items())}, file, indent=1)
+
+    print("wrote ", len(event_files), " event files and ", len(pages), " pages to ", FIXTURE_DIR)
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="generate the pipeline benchmark fixtures")
+    arg_parser.add_argument("--seed", type=int, default=2019)
+    args = arg_parser.parse_args()
+
+    make_fixtures(args.seed)
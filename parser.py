@@ -8,24 +8,44 @@ This scipt will parse retrosheet event files and compile a dataset into a csv fi
     - It will write the csv file somewhere
 
 This script requiries the following libraries to installed
-    import requests
-    from bs4 import BeautifulSoup, Comment
     from EventGame import EventGame
+    from EventRecords import tokenize_game
+    from Boxscore import Boxscore
     from PlayerScraper import PlayerScraper
+    from PageCache import PageCache
+    from DatasetWriter import CsvDatasetWriter, ParquetDatasetWriter
+    from PlayerIdMap import PlayerIdMap
+    from SeasonEngine import SeasonEngine
+    from FeatureBuilder import build_feature_matrix
+    from BuildManifest import BuildManifest, hash_file, hash_text
+    from GameIndex import GameIndex
+    from Metrics import METRICS, QUIET, INFO, DEBUG
     import pandas as pd
     from os import listdir
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from itertools import islice
 
 EventGame and PlayerScraper are two custom libraries that I need to figure out
 how to package or whatever.
 """
-import requests
-from bs4 import BeautifulSoup, Comment
 from EventGame import EventGame
+from EventRecords import tokenize_game
+from Boxscore import Boxscore, boxscore_url
 from PlayerScraper import PlayerScraper
+from PageCache import PageCache
+from DatasetWriter import CsvDatasetWriter, ParquetDatasetWriter
+from PlayerIdMap import PlayerIdMap
+from SeasonEngine import SeasonEngine
+from FeatureBuilder import build_feature_matrix
+from BuildManifest import BuildManifest, hash_file, hash_text
+from GameIndex import GameIndex
+from Metrics import METRICS, QUIET, INFO, DEBUG
 import pandas as pd
 from os import listdir
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
 
-DF_COLS = ['date', 'home_team', 'away_team', 'temperature', 'wind_direction',
+DF_COLS = ['game_id', 'date', 'home_team', 'away_team', 'temperature', 'wind_direction',
    'wind_speed', 'first_home_ba', 'first_home_obp', 'first_home_slg',
    'first_home_ops', 'second_home_ba', 'second_home_obp',
    'second_home_slg', 'second_home_ops', 'third_home_ba', 'third_home_obp',
@@ -36,13 +56,16 @@ DF_COLS = ['date', 'home_team', 'away_team', 'temperature', 'wind_direction',
    'home_KOP', 'home_BBP', 'away_ERA', 'away_WHIP', 'away_FIP', 'away_KOP',
    'away_BBP', 'first_inning_total']
 
-PLAYER_SCRAPER = PlayerScraper()
+PAGE_CACHE = PageCache()
+PLAYER_SCRAPER = PlayerScraper(PAGE_CACHE)
+ID_MAP = PlayerIdMap.from_csv()
 
 # chunks the games from a retrosheet event file
 # datafile - the event file to chunk up
 # returns the list of string lists (the game)
 def chunk_games(datafile:str):
-    """ Parses a retrosheet event file into a list of EventGame objects
+    """ Parses a retrosheet event file into a list of EventGame objects with
+        their lineups and boxscores fetched from baseball-reference.com
 
     Parameters
     ----------
@@ -54,35 +77,112 @@ def chunk_games(datafile:str):
     games
         a list of EventGames that represent the retrosheet file
     """
-    #open the file
+    return list(enrich_games(iter_games(datafile)))
+
+# lazily split an event file into game chunks
+def iter_game_chunks(datafile:str):
+    """ Reads a retrosheet event file one line at a time and yields the lines of
+        each game. only one game is held in memory at a time
+
+    Parameters
+    ----------
+    datafile : str
+        The retrosheet eventfile to read
+
+    Yields
+    ------
+    game_chunk : [str]
+        the lines of a game, starting with its id record
+    """
     with open(datafile) as file:
-        lines = file.readlines()
-        prev_start = 0
-        start = 0
-        games = []
+        game_chunk = []
+        for line in file:
+            #a new id record starts the next game
+            if(line.startswith("id") and game_chunk):
+                yield game_chunk
+                game_chunk = []
+
+            #skip anything before the first game
+            if(game_chunk or line.startswith("id")):
+                game_chunk.append(line)
+
+        if(game_chunk):
+            yield game_chunk
+
+# lazily parse an event file into games without touching the network
+def iter_games(datafile:str, ps=None):
+    """ Parses a retrosheet event file into EventGames one game at a time. the
+        games hold their retrosheet lineups and have not been enriched with any
+        data from baseball-reference.com
+
+    Parameters
+    ----------
+    datafile : str
+        The retrosheet eventfile to parse
+
+    ps : PlayerScraper or SeasonEngine
+        where the games get their player stats from, PLAYER_SCRAPER by default
+
+    Yields
+    ------
+    game : EventGame
+        the next game in the file
+    """
+    for game_chunk in iter_game_chunks(datafile):
+        with METRICS.timer("event_parse"):
+            game = parse_game_chunk(game_chunk, ps)
+        yield game
+
+# parse chosen games of an event file without reading the rest of it
+def iter_indexed_games(datafile:str, game_ids, ps=None):
+    """ Parses only the given games of a retrosheet event file, reading each
+        one straight from its offset in the game index
+
+    Parameters
+    ----------
+    datafile : str
+        The retrosheet eventfile the games are in
+
+    game_ids : [str]
+        the ids of the games to parse
 
-        #chunk up the games from the file - skip the first row
-        for i in range(len(lines[1:])):
-            line = lines[i+1] #add one to fit the offset
+    ps : PlayerScraper or SeasonEngine
+        where the games get their player stats from, PLAYER_SCRAPER by default
 
-            if(line.startswith("id")):
-                end = i + 1
+    Yields
+    ------
+    game : EventGame
+        the games in the order of game_ids
+    """
+    index = GameIndex.load(datafile)
+    try:
+        for game_id in game_ids:
+            with METRICS.timer("event_parse"):
+                game = parse_game_chunk(index.chunk(game_id), ps)
+            yield game
+    finally:
+        index.close()
+
+# parse the game chunk into an event game object
+def parse_game_chunk(game_chunk, ps=None):
+    """ Parses a game chunk into an EventGame using only the retrosheet data
 
-                #add the game chunk to the list
-                game_chunk = lines[start: end]
-                game = process_game_chunk(game_chunk)
-                games.append(game)
+    Parameters
+    ----------
+    game_chunk : list of strings
+        a chunk from the the retrosheet file that contains information about a baseball game
 
-                #update the starting index for the game chunk
-                prev_start = start
-                start = end
+    ps : PlayerScraper or SeasonEngine
+        where the game gets its player stats from, PLAYER_SCRAPER by default
 
-        #add the last game
-        last_game = lines[start:]
-        print("the last game ", lines[start])
-        games.append(process_game_chunk(last_game))
+    Returns
+    -------
+        a new EventGame object with the retrosheet lineups
+    """
+    records = tokenize_game(game_chunk)
 
-    return games
+    ps = ps if ps is not None else PLAYER_SCRAPER
+    return EventGame(records, ps)
 
 # process the game chunk into an event game object
 def process_game_chunk(game_chunk):
@@ -97,47 +197,115 @@ def process_game_chunk(game_chunk):
     -------
         a new EventGame object with the information from the game_chunk
     """
-    game_id = get_game_id(game_chunk)
-    print("processing chunk ", game_id, " ...")
-    info_dict = make_info_dict(game_chunk)
-    game_events = get_game_events(game_chunk)
+    return enrich_game(parse_game_chunk(game_chunk))
 
-    roster_html = get_roster_html(game_id)
+################################################################################
+### NETWORK ENRICHMENT #########################################################
+# swap in the baseball-reference lineups and attach the boxscore
+def enrich_game(game, scrape_unmapped=True):
+    """ Swaps the retrosheet player ids in the lineups of a game for
+        baseball-reference.com ids. the ids come from the local id map, the
+        boxscore lineups are only scraped for a team with a player missing from it
 
-    home_lineup = get_lineup(game_chunk, roster_html, '1')
-    away_lineup = get_lineup(game_chunk, roster_html, '0')
+    Parameters
+    ----------
+    game : EventGame
+        a game parsed from the retrosheet file
 
-    return EventGame(game_id, info_dict, game_events, home_lineup, away_lineup, PLAYER_SCRAPER)
+    scrape_unmapped : bool
+        scrape the boxscore lineups when a player isnt in the id map, otherwise
+        the retrosheet id is kept
 
-################################################################################
-### DATA PARSERS FOR A GAME CHUNK ##############################################
-#get the game id from a game chunk
-def get_game_id(game_chunk):
-    """ Parses the game_id from a game_chunk
+    Returns
+    -------
+        the same game, enriched
     """
-    id_row = game_chunk[0]
-    return id_row.split(",")[1].strip()
+    METRICS.log(DEBUG, "processing game ", game.id, " ...")
+    METRICS.count("games_enriched")
+
+    home_lineup = map_lineup(game.home_lineup)
+    away_lineup = map_lineup(game.away_lineup)
+
+    if(scrape_unmapped and (home_lineup is None or away_lineup is None)):
+        #the boxscore is fetched once for both teams
+        roster_html = Boxscore(game.id, PAGE_CACHE).lineups()
 
-#make the info dictinary from the game chunk
-def make_info_dict(game_chunk):
-    """ Parses the information data from a game_chunk
+        if(home_lineup is None):
+            home_lineup = get_lineup(game.home_lineup, roster_html, '1')
+        if(away_lineup is None):
+            away_lineup = get_lineup(game.away_lineup, roster_html, '0')
+
+    game.enrich(home_lineup or game.home_lineup, away_lineup or game.away_lineup)
+    return game
+
+# check if a game has a player missing from the id map
+def needs_boxscore(game):
+    return map_lineup(game.home_lineup) is None or map_lineup(game.away_lineup) is None
+
+# swap in the baseball-reference ids from the id map
+# returns None if a player in the lineup isnt mapped
+def map_lineup(starters):
+    """ Swaps the retrosheet ids in a lineup for the baseball-reference.com ids
+        in ID_MAP
+
+    Parameters
+    ----------
+    starters : [Starter]
+        the starting lineup of a team
+
+    Returns
+    -------
+        the lineup with baseball-reference ids, or None if a player is missing
+        from the id map
     """
-    info_dict = {}
-    info_rows = [x for x in game_chunk if x.startswith("info")]
+    lineup = []
+    for starter in starters:
+        baseball_ref_id = ID_MAP.get(starter.player_id)
+        if(baseball_ref_id is None):
+            return None
+
+        lineup.append(starter._replace(player_id=baseball_ref_id))
+
+    return lineup
+
+# enrich a stream of games, fetching the boxscores of each batch in parallel
+def enrich_games(games, batch_size=8):
+    """ Enriches a stream of games in batches. the boxscores a batch needs are
+        fetched together through the fetch engine before the games are enriched
 
-    for row in info_rows:
-        key = row.split(",")[1]
-        value = row.split(",")[2]
+    Parameters
+    ----------
+    games : iterable of EventGame
+        games parsed from the retrosheet file
 
-        info_dict[key] = value.strip()
+    batch_size : int
+        the number of games fetched together
 
-    return info_dict
+    Yields
+    ------
+    game : EventGame
+        the enriched games in the same order
+    """
+    games = iter(games)
+    while(True):
+        batch = list(islice(games, batch_size))
+        if(not batch):
+            return
+
+        #only the games with players missing from the id map need their boxscore
+        urls = [boxscore_url(game.id) for game in batch if needs_boxscore(game)]
+        PLAYER_SCRAPER.fetch_engine.fetch_all(urls)
+        for game in batch:
+            yield enrich_game(game)
 
-#get the events for  a game chunk
-def get_game_events(game_chunk):
-    """Parses the events of a game from a game_chunk
+################################################################################
+### DATA PARSERS FOR A GAME CHUNK ##############################################
+#get the game id from a game chunk
+def get_game_id(game_chunk):
+    """ Parses the game_id from a game_chunk
     """
-    return [x.strip() for x in game_chunk if x.startswith("play") or x.startswith("com") or x.startswith("sub")]
+    id_row = game_chunk[0]
+    return id_row.split(",")[1].strip()
 
 ################################################################################
 ### BASEBALL-REFERENCE DATA PARSERS ############################################
@@ -155,40 +323,20 @@ def get_roster_html(game_id:str):
     -------
         a BeautifulSoup object containing the html of the starting lineup
     """
-    #get the team abv from the game id
-    team_abv = game_id[:3]
-
-    #format the url
-    url_pattern = "https://www.baseball-reference.com/boxes/{}/{}.shtml"
-    url = url_pattern.format(team_abv, game_id.strip())
-
-    #get all the comments
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'lxml')
-    comments = soup.findAll(text=lambda text:isinstance(text, Comment))
-
-    #find the lineup index
-    lineup_idx = 0
-    for i in range(len(comments)):
-        if("div_lineups" in comments[i].string):
-            lineup_idx = i
-
-    lineups_html = comments[lineup_idx] #MAKE SURE THIS NUMBER IS THE SAME - MAKE IT NOT MAGIC
-
-    return BeautifulSoup(lineups_html, 'lxml')
+    return Boxscore(game_id, PAGE_CACHE).lineups()
 
 # get the line for the team
-# game_chunk - game_chunk from retrosheet file
+# starters - the retrosheet lineup of the team
 # roster_html - roster html from baseball-reference.com
 # location - pass in 0 for the away team - pass in 1 for the home team
-def get_lineup(game_chunk, roster_html, location):
-    """Parses the lineups for a team from a game_chunk and swaps the retrosheet
-        player_id with the baseball-reference.com id
+def get_lineup(starters, roster_html, location):
+    """Swaps the retrosheet player_ids in a team's lineup with the
+        baseball-reference.com ids
 
       Parameters
       ---------
-      game_chunk : [str]
-        a list of strings representing a a retrosheet game
+      starters : [Starter]
+        the retrosheet starting lineup of the team
 
       roster_html : BeautifulSoup
         a BeautifulSoup object with the starting lineup html from baseball-reference.com
@@ -203,9 +351,6 @@ def get_lineup(game_chunk, roster_html, location):
     if(location == '1'):
         lineup_html = roster_html.find(id="lineups_2").find_all("a")
 
-    #pull the players from the game chunk
-    starters = [x for x in game_chunk if x.startswith("start") and x.split(",")[3] == location]
-
     #combine the lineup with in from baseball-refernce
     for player, starter in zip(lineup_html, starters):
         #get the baseball_ref_id
@@ -215,82 +360,401 @@ def get_lineup(game_chunk, roster_html, location):
         if(baseball_ref_id == "sabatc"):
             baseball_ref_id = "sabatc.01"
 
-        #break up the starter list and swap in the baseball_ref_id
-        starter_lst = starter.split(",")
-        starter_lst[1] = baseball_ref_id
-
-        #add the new info to the lineup
-        lineup.append(",".join(starter_lst).strip())
+        #swap in the baseball_ref_id
+        lineup.append(starter._replace(player_id=baseball_ref_id))
 
     return lineup
 
 
+# convert one event file into a csv file
+# games already in the csv file from an earlier run are skipped
+def write_event_file(filepath:str, output_path:str, season_engine=None, output_format="csv", stale_games=()):
+    """ Streams the dataset records for the games in an event file into a csv
+        file, skipping the games already written by an earlier run
+
+    Parameters
+    ----------
+    filepath : str
+        the retrosheet event file
+
+    output_path : str
+        the csv file, or the parquet partition directory, to write the records to
+
+    season_engine : SeasonEngine
+        a replayed season to take the player stats from instead of scraping them.
+        the games are not enriched and keep their retrosheet player ids
+
+    output_format : str
+        csv or parquet
+
+    stale_games : Set[str]
+        ids of games in the output that are out of date and have to be rebuilt
+
+    Returns
+    -------
+        the number of records written
+    """
+    written = 0
+    with open_dataset_writer(output_path, output_format) as writer:
+        writer.discard(stale_games)
+
+        #only the games that arent written yet are enriched
+        games = (game for game in iter_games(filepath, season_engine) if game.id not in writer)
+        for record in iter_records(games, season_engine):
+            METRICS.log(DEBUG, "adding record for game ", record["game_id"])
+            writer.write(record)
+            written += 1
+            METRICS.count("records")
+
+    METRICS.log(INFO, "wrote ", written, " rows to ", output_path)
+    return written
+
+# open the csv or parquet writer for an output
+def open_dataset_writer(output_path:str, output_format="csv"):
+    if(output_format == "parquet"):
+        return ParquetDatasetWriter(output_path, DF_COLS)
+
+    return CsvDatasetWriter(output_path, DF_COLS)
+
+# build the dataset records for a stream of games
+def iter_records(games, season_engine=None):
+    """ Builds the dataset record of each game, scraping the player stats or,
+        with a replayed season, building every record in one vectorized pass
+
+    Returns
+    -------
+        an iterable of records in the order of the games
+    """
+    if(season_engine is None):
+        return (game.create_dataset_record() for game in enrich_games(games))
+
+    with METRICS.timer("record"):
+        return build_feature_matrix(list(games), season_engine)[DF_COLS].to_dict("records")
+
+# build the records for a shard of games in a worker process
+# returns the records and the metrics of the worker
+def build_records_job(filepath, game_ids, season_engine=None):
+    METRICS.reset()
+    records = list(iter_records(iter_indexed_games(filepath, game_ids, season_engine), season_engine))
+    return records, METRICS.snapshot()
+
+# build the dataset rows of many event files at once
+def build_features(filepaths, season_engine):
+    """ Builds the dataset rows for every game in the event files in one
+        vectorized pass against a replayed season
+
+    Parameters
+    ----------
+    filepaths : [str]
+        event files from the season of the engine
+
+    season_engine : SeasonEngine
+        the replayed season
+
+    Returns
+    -------
+    features : DataFrame
+        the DF_COLS columns with a row per game
+    """
+    games = [game for filepath in filepaths for game in iter_games(filepath, season_engine)]
+    return build_feature_matrix(games, season_engine)[DF_COLS]
+
+# write an event file in a worker process
+# returns the number of records written and the metrics of the worker
+def write_event_file_job(filepath, output_path, season_engine=None, output_format="csv", stale_games=()):
+    METRICS.reset()
+    written = write_event_file(filepath, output_path, season_engine, output_format, stale_games)
+    return written, METRICS.snapshot()
+
+# hash every game in an event file
+def hash_games(datafile:str):
+    """ Hashes the records of each game in an event file
+
+    Returns
+    -------
+    game_hashes : Dict[str, str]
+        the hash of each game keyed by the game id
+    """
+    return {get_game_id(chunk): hash_text("".join(chunk)) for chunk in iter_game_chunks(datafile)}
+
+# replay the event files of a season into a season engine
+def build_season_engine(season, filepaths):
+    """ Replays the event files of a season to get every players stats going
+        into every game without scraping
+
+    Parameters
+    ----------
+    season : int
+        the season of the event files
+
+    filepaths : [str]
+        every event file of the season, so each player has all their games
+
+    Returns
+    -------
+        the replayed SeasonEngine
+    """
+    engine = SeasonEngine(season)
+    games = (game for filepath in filepaths for game in iter_games(filepath, engine))
+    return engine.replay(games)
+
+# the csv file or parquet partition an event file is written to
+def output_path_for(file:str, output_format="csv"):
+    if(output_format == "parquet"):
+        return "./data/parquet_data/season={}/team={}".format(file[:4], file[4:7])
+
+    return "./data/csv_data/" + file.split(".")[0] + ".csv"
+
+# convert event files with the games split into shards across processes
+def convert_game_shards(jobs, engines, workers, output_format, shard_size, manifest):
+    """ Builds the records of the event files in shards of games on a process
+        pool. this process owns every writer and writes each shard as it comes
+        back, and an event file is recorded in the manifest once all of its
+        shards are written
+
+    Parameters
+    ----------
+    jobs : [tuple]
+        the (filepath, output_path, season, inputs_hash, game_hashes, stale_games)
+        of each event file to convert
+
+    engines : Dict[str, SeasonEngine]
+        the replayed season of each season when building offline
+    """
+    writers = {}
+    remaining = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for job in jobs:
+            filepath, output_path, season, inputs_hash, game_hashes, stale_games = job
+            writer = open_dataset_writer(output_path, output_format)
+            writer.discard(stale_games)
+
+            #only the games that arent written yet are sharded
+            index = GameIndex.load(filepath)
+            game_ids = [game_id for game_id in index.game_ids() if game_id not in writer]
+            shards = [game_ids[i:i + shard_size] for i in range(0, len(game_ids), shard_size)]
+
+            if(not shards):
+                writer.close()
+                manifest.record(filepath, inputs_hash, output_path, game_hashes)
+                continue
+
+            writers[filepath] = writer
+            remaining[filepath] = len(shards)
+            for shard in shards:
+                futures[executor.submit(build_records_job, filepath, shard, engines.get(season))] = job
+
+        METRICS.log(INFO, "converting ", len(futures), " shards of ", shard_size, " games with ", workers, " processes...")
+        for future in as_completed(futures):
+            filepath, output_path, season, inputs_hash, game_hashes, _ = futures[future]
+            records, metrics = future.result()
+            METRICS.merge(metrics)
+
+            for record in records:
+                writers[filepath].write(record)
+                METRICS.count("records")
+
+            remaining[filepath] -= 1
+            if(remaining[filepath] == 0):
+                writers.pop(filepath).close()
+                manifest.record(filepath, inputs_hash, output_path, game_hashes)
+                METRICS.log(INFO, "finished ", filepath)
+
+# rebuild the dataset rows of chosen games
+def rebuild_games(game_ids, offline=False, output_format="csv"):
+    """ Rebuilds the dataset rows of the given games in place. only those games
+        are read from their event files, through the game index, and their old
+        rows are replaced
+
+    Parameters
+    ----------
+    game_ids : [str]
+        the ids of the games to rebuild
+
+    offline : bool
+        compute the player stats by replaying the seasons event files instead of
+        scraping baseball-reference.com
+
+    output_format : str
+        csv or parquet
+    """
+    dir_path = "./data/event_data/"
+    filenames = sorted(listdir(dir_path))
+
+    #the season and home team in the game id name its event file, BOS201904090 is in 2019BOS.EVA
+    games_by_file = {}
+    for game_id in game_ids:
+        matches = [file for file in filenames if file.startswith(game_id[3:7] + game_id[:3])]
+        if(not matches):
+            raise ValueError("there is no event file for the game {}".format(game_id))
+        games_by_file.setdefault(matches[0], []).append(game_id)
+
+    engines = {}
+    for file, file_game_ids in games_by_file.items():
+        season_engine = None
+        if(offline):
+            season = file[:4]
+            if(season not in engines):
+                season_files = [dir_path + f for f in filenames if f.startswith(season)]
+                engines[season] = build_season_engine(season, season_files)
+            season_engine = engines[season]
+
+        output_path = output_path_for(file, output_format)
+        with open_dataset_writer(output_path, output_format) as writer:
+            writer.discard(file_game_ids)
+            games = iter_indexed_games(dir_path + file, file_game_ids, season_engine)
+            for record in iter_records(games, season_engine):
+                writer.write(record)
+                METRICS.count("records")
+
+        METRICS.log(INFO, "rebuilt ", len(file_game_ids), " games in ", output_path)
+
+    METRICS.log(QUIET, METRICS.summary())
+
 #scrape_all the filess
-def scrape_all_files():
+def scrape_all_files(workers=1, offline=False, output_format="csv", seasons=None, shard_size=None):
     """  Convert all the event files in ./data/event_data and create a csv table
          of the first innning data
+
+    Parameters
+    ----------
+    workers : int
+        the number of processes to convert the files with. each file has its own
+        csv file so they are converted independently, and the processes share the
+        fetched pages through the on disk page cache
+
+    offline : bool
+        compute the player stats by replaying each seasons event files instead of
+        scraping baseball-reference.com
+
+    output_format : str
+        csv for a csv file per event file in ./data/csv_data, or parquet for a
+        dataset in ./data/parquet_data partitioned by season and team
+
+    seasons : [int]
+        the seasons to build, every season in ./data/event_data by default. all
+        the seasons share the page cache, gamelog cache and fetch engine
+
+    shard_size : int
+        with more than one worker, split the work into shards of this many games
+        instead of a file per process, so a few large files dont leave the other
+        processes idle. the workers build the records and this process writes them
+
+    the build manifest in ./data/build_manifest.json is used to skip the files
+    that havent changed since they were built and to rebuild only the edited
+    games of the ones that have
     """
-    csv_dirpath = "./data/csv_data/"
     dir_path = "./data/event_data/"
-    filenames = listdir(dir_path)
+    filenames = sorted(listdir(dir_path))
 
-    #get all the event files
-    for file in filenames:
-        event_df = pd.DataFrame(columns=DF_COLS)
-        print("adding file ", file, " ...")
-        filepath = dir_path + file
-        games = chunk_games(filepath)
+    #the event files are named like 2019BOS.EVA
+    if(seasons is not None):
+        seasons = set(str(season) for season in seasons)
+        filenames = [file for file in filenames if file[:4] in seasons]
 
-        print("chunked games, adding to dataframe...")
+    manifest = BuildManifest(feature_columns=DF_COLS, mode="offline" if offline else "online")
+    file_hashes = {file: hash_file(dir_path + file) for file in filenames}
 
-        #add the record for each game to the row
-        for game in games:
-            record = game.create_dataset_record()
-            print("adding record for game ", game.id)
-            event_df = event_df.append(record, ignore_index=True)
-            print('-'*50)
+    #with offline stats every game depends on the whole season
+    season_hashes = {}
+    if(offline):
+        for season in set(file[:4] for file in filenames):
+            season_files = sorted(file for file in filenames if file.startswith(season))
+            season_hashes[season] = hash_text("".join(file_hashes[file] for file in season_files))
 
-        #write the team frame to a csv file
-        csv_filename = file.split(".")[0] + ".csv"
-        csv_filepath = csv_dirpath + csv_filename
-
-        print("writing ", event_df.shape[0], " rows to file ", csv_filepath)
+    #pair up each event file with its output, skipping the ones that are already built
+    jobs = []
+    for file in filenames:
+        filepath = dir_path + file
+        output_path = output_path_for(file, output_format)
+
+        inputs_hash = season_hashes.get(file[:4], file_hashes[file])
+        if(manifest.is_current(filepath, inputs_hash, output_path)):
+            METRICS.log(INFO, file, " is already built... skipping")
+            continue
+
+        game_hashes = hash_games(filepath)
+        stale_games = manifest.stale_games(filepath, game_hashes)
+        if(offline):
+            stale_games |= set(game_hashes)
+        jobs.append((filepath, output_path, file[:4], inputs_hash, game_hashes, stale_games))
+
+    #replay each season that has something to build once
+    engines = {}
+    if(offline):
+        for season in sorted(set(job[2] for job in jobs)):
+            season_files = [dir_path + file for file in filenames if file.startswith(season)]
+            engines[season] = build_season_engine(season, season_files)
+
+    if(workers > 1):
+        METRICS.log(INFO, "converting ", len(jobs), " files with ", workers, " processes...")
+
+        #every process throttles its own requests so they split the request rate
+        limiter = PAGE_CACHE.http_client.limiter
+        requests_per_second = limiter.requests_per_second
+        if(requests_per_second):
+            limiter.requests_per_second = requests_per_second / workers
+
+        if(shard_size):
+            convert_game_shards(jobs, engines, workers, output_format, shard_size, manifest)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(write_event_file_job, job[0], job[1], engines.get(job[2]), output_format, job[5]): job
+                           for job in jobs}
+
+                #report the files as they finish
+                for done, future in enumerate(as_completed(futures), 1):
+                    filepath, output_path, season, inputs_hash, game_hashes, _ = futures[future]
+                    written, metrics = future.result()
+                    METRICS.merge(metrics)
+                    METRICS.log(INFO, "[{}/{}] finished {} ({} rows)".format(done, len(jobs), filepath, written))
+                    manifest.record(filepath, inputs_hash, output_path, game_hashes)
+
+        limiter.requests_per_second = requests_per_second
+    else:
+        #get all the event files
+        for filepath, output_path, season, inputs_hash, game_hashes, stale_games in jobs:
+            METRICS.log(INFO, "adding file ", filepath, " ...")
+            write_event_file(filepath, output_path, engines.get(season), output_format, stale_games)
+            manifest.record(filepath, inputs_hash, output_path, game_hashes)
 
-        event_df.to_csv(csv_filepath, index=False)
+    METRICS.log(QUIET, METRICS.summary())
 
 ################################################################################
 ### MAIN #######################################################################
 if __name__ == "__main__":
 
     TEST = False
+    WORKERS = 1
+    OFFLINE = False
+    OUTPUT_FORMAT = "csv"
+    SEASONS = None
+    SHARD_SIZE = None
+    VERBOSITY = INFO
+    PROFILE = False
+
+    METRICS.verbosity = VERBOSITY
 
     if(TEST):
         csv_dirpath = "./data/csv_data/"
         filepath = "./data/event_data/2019BOS.EVA"
         testfile = "./data/test_data.txt"
 
-        event_df = pd.DataFrame(columns=DF_COLS)
-
-        games = chunk_games(filepath)
-        print("chunked games, adding to dataframe...")
-
-        #add the record for each game to the row
-        for game in games:
-            record = game.create_dataset_record()
-            print("adding record for game ", game.id)
-            event_df = event_df.append(record, ignore_index=True)
-            print('-'*50)
-
         #write the team frame to a csv file
         csv_filename = "2019BOS.csv"
         csv_filepath = csv_dirpath + csv_filename
 
-        print("writing ", event_df.shape[0], "rows to the file ", csv_filename)
-        event_df.to_csv(csv_filepath, index=False)
-        print(event_df.info())
+        write_event_file(filepath, csv_filepath)
+        print(pd.read_csv(csv_filepath).info())
+
+    elif(PROFILE):
+        #profiling only sees the main process so the files are converted in it
+        with METRICS.profile("./data/scrape_all_files.prof"):
+            scrape_all_files(1, OFFLINE, OUTPUT_FORMAT, SEASONS)
 
     else:
-        scrape_all_files()
+        scrape_all_files(WORKERS, OFFLINE, OUTPUT_FORMAT, SEASONS, SHARD_SIZE)
         #filepath = "./data/event_data/2019BOS.EVA"
         #games = chunk_games(filepath)
         #print(games[-1])
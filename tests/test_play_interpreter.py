@@ -0,0 +1,90 @@
+import os
+import pytest
+from EventRecords import tokenize_game
+from PlayInterpreter import PLAY_STATS, check_linescores, first_inning_runs, play_stats, runs_on_play
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+#the stats a play adds, only the ones that arent 0
+def nonzero_stats(event):
+    return {stat: value for stat, value in zip(PLAY_STATS, play_stats(event)) if value}
+
+################################################################################
+### RUNS #######################################################################
+@pytest.mark.parametrize("event, runs", [
+    ("S8/G", 0),
+    #the batter scoring on a home run is implied
+    ("HR/F7", 1),
+    ("H/L7", 1),
+    ("HR/F7.3-H;2-H;1-H", 4),
+    #unless the batter is in the advances
+    ("HR/F78.B-H;1-H", 2),
+    ("HR/F7.1-H;B-H", 2),
+    #so is the runner on third stealing home
+    ("SBH", 1),
+    ("SB2;SBH", 1),
+    ("SBH.3-H", 1),
+    #a runner thrown out at home scores when an error negates the out
+    ("S7/G.3XH(7E2);2-3", 1),
+    ("S8/G.3XH(82);1-2", 0),
+    ("CSH(2E2)", 1),
+    ("CSH(2E2).3-H", 1),
+    ("CSH(12)", 0),
+    ("K+WP.3-H", 1),
+    ("8/SF.3-H(UR);1-2", 1),
+    ("E5/G.3-H(NR);B-1", 1),
+])
+def test_runs_on_play(event, runs):
+    assert runs_on_play(event) == runs
+
+def test_first_inning_runs_by_team():
+    records = tokenize_game(["id,BOS201904090\n",
+                             "play,1,0,awayb001,00,X,HR/F7\n",
+                             "play,1,1,homeb001,00,X,S8/G\n",
+                             "play,1,1,homeb002,00,X,D7/L.1-H\n",
+                             "play,2,0,awayb002,00,X,HR/F7\n"])
+    assert first_inning_runs(records.plays()) == (1, 1)
+
+def test_linescore_fixture():
+    datafile = os.path.join(FIXTURE_DIR, "2019BOS.EVA")
+    fixture_file = os.path.join(FIXTURE_DIR, "2019BOS_linescores.csv")
+    assert check_linescores(datafile, fixture_file) == 0
+
+################################################################################
+### PLAY STATS #################################################################
+@pytest.mark.parametrize("event, expected", [
+    ("S8", {"PA": 1, "AB": 1, "H": 1}),
+    ("D7/L", {"PA": 1, "AB": 1, "H": 1, "2B": 1}),
+    ("T9/F", {"PA": 1, "AB": 1, "H": 1, "3B": 1}),
+    ("HR/F7", {"PA": 1, "AB": 1, "H": 1, "HR": 1}),
+    ("W", {"PA": 1, "BB": 1}),
+    ("IW", {"PA": 1, "BB": 1}),
+    ("HP", {"PA": 1, "HBP": 1}),
+    ("K", {"PA": 1, "AB": 1, "SO": 1, "outs": 1}),
+    ("E6/G", {"PA": 1, "AB": 1}),
+    ("8/SF.3-H", {"PA": 1, "SF": 1, "outs": 1}),
+    ("63/SH.1-2", {"PA": 1, "outs": 1}),
+])
+def test_play_stats_batter_result(event, expected):
+    assert nonzero_stats(event) == expected
+
+@pytest.mark.parametrize("event, outs", [
+    ("64(1)3/GDP", 2),
+    ("FC5/G.1X2(54)", 1),
+    ("S7.1X3(75)", 1),
+    ("K+SB2", 1),
+    #the dropped third strike lets the batter reach
+    ("K+WP.B-1", 0),
+])
+def test_play_stats_outs(event, outs):
+    assert play_stats(event)[PLAY_STATS.index("outs")] == outs
+
+@pytest.mark.parametrize("event, expected", [
+    ("SB2", {}),
+    ("NP", {}),
+    ("CS2(24)", {"outs": 1}),
+    #the error lets the runner stay safe
+    ("CS2(2E4)", {}),
+])
+def test_play_stats_no_plate_appearance(event, expected):
+    assert nonzero_stats(event) == expected
@@ -0,0 +1,71 @@
+import json
+import os
+import pytest
+from GamelogStore import GamelogStore
+from PageCache import PageCache
+from PitchingRates import FIP_CONSTANT, rates_from_totals
+from PlayerScraper import PlayerScraper, add_pitching_totals, build_gamelog_table, index_gamelog
+
+PAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "pages")
+
+#a pitching gamelog page with no charset, the dates have a utf-8 non breaking space
+PITCHING_PAGE = ('<html><body><table id="pitching_gamelogs"><thead><tr>'
+                 '<th data-stat="ranker">Rk</th><th data-stat="date_game">Date</th><th data-stat="IP">IP</th>'
+                 '</tr></thead><tbody>'
+                 '<tr id="pitching_gamelogs.1"><th data-stat="ranker">1</th><td data-stat="date_game">Apr\xa03</td><td data-stat="IP">6.0</td></tr>'
+                 '<tr id="pitching_gamelogs.2"><th data-stat="ranker">2</th><td data-stat="date_game">Apr\xa09(2)</td><td data-stat="IP">5.2</td></tr>'
+                 '</tbody></table></body></html>').encode("utf-8")
+
+################################################################################
+### GAMELOG TABLES #############################################################
+def test_pitching_dates_without_charset():
+    table = build_gamelog_table(PITCHING_PAGE, "pitching_gamelogs")
+    assert list(table["date_game"]) == ["Apr\xa03", "Apr\xa09(2)"]
+
+    gamelog = index_gamelog(table)
+    assert gamelog.date_index == {"04030": 0, "04092": 1}
+
+def test_text_pages_are_parsed_as_given():
+    table = build_gamelog_table(PITCHING_PAGE.decode("utf-8"), "pitching_gamelogs")
+    assert list(table["IP"]) == [6.0, 5.2]
+
+def test_pitching_totals_before_each_game():
+    table = add_pitching_totals(build_gamelog_table(PITCHING_PAGE, "pitching_gamelogs").assign(
+        BB=[1, 2], HBP=[0, 1], H=[4, 3], HR=[1, 0], SO=[7, 5], batters_faced=[24, 22]))
+    assert list(table["prev_outs"]) == [0, 18]
+    assert list(table["prev_SO"]) == [0, 7]
+
+################################################################################
+### PITCHING STATS #############################################################
+#a scraper over the recorded gamelog pages of the pipeline benchmark
+@pytest.fixture
+def scraper(tmp_path):
+    page_cache = PageCache(str(tmp_path / "pages.sqlite"), max_bytes=None)
+    with open(os.path.join(PAGE_DIR, "index.json")) as file:
+        for url, filename in json.load(file).items():
+            with open(os.path.join(PAGE_DIR, filename), 'rb') as page:
+                page_cache.put(url, page.read())
+    page_cache.offline = True
+
+    return PlayerScraper(page_cache, gamelog_store=GamelogStore(str(tmp_path / "gamelogs.sqlite")))
+
+def test_rates_from_totals():
+    rates = rates_from_totals(BF=[0, 25], outs=[0, 18], H=[0, 5], HR=[0, 1], BB=[0, 2], HBP=[0, 1], SO=[0, 6], ER=[0, 2])
+    assert list(rates["ERA"]) == [-1, 3.0]
+    assert list(rates["FIP"]) == [-1, pytest.approx((13 + 9 - 12) / 6 + FIP_CONSTANT)]
+    assert list(rates["WHIP"]) == [-1, pytest.approx(7 / 6)]
+    assert list(rates["KO_perc"]) == [-1, 6 / 25]
+    assert "ERA" not in rates_from_totals(1, 3, 0, 0, 0, 0, 1)
+
+def test_scalar_and_batch_pitching_stats_agree(scraper):
+    pitcher_id = "floremi01"
+    dates = list(scraper.scrape_pitcher_gamelog(pitcher_id, 2019).date_index)
+    assert len(dates) > 1 and "-1" not in dates
+
+    batch = scraper.get_pitching_stats_many([pitcher_id] * len(dates), dates, 2019)
+    for row, game_date in enumerate(dates):
+        stats = scraper.get_pitching_stats(pitcher_id, game_date, 2019)
+        assert stats == pytest.approx(batch.iloc[row].to_dict())
+
+    #the first game of the season has no stats before it
+    assert set(batch.iloc[0]) == {-1}
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from EventGame import EventGame
+from EventRecords import tokenize_game
+from SeasonEngine import BATTING_STATS, PITCHING_STATS, SeasonEngine
+
+#two games between the same teams, the away starter is relieved in the first
+#by a pitcher with a comma in their name
+FIRST_GAME = [
+    "id,BOS201904090",
+    "info,visteam,TOR",
+    "info,hometeam,BOS",
+    'start,awayb001,"Away Batter",0,1,8',
+    'start,awayp001,"Away Starter",0,0,1',
+    'start,homeb001,"Home Batter",1,1,8',
+    'start,homep001,"Home Starter",1,0,1',
+    "play,1,0,awayb001,00,,S8",
+    "play,1,1,homeb001,00,,HR/F7",
+    'sub,awayr001,"Smith, Jr.",0,0,1',
+    "play,2,1,homeb001,00,,K",
+    "data,er,awayp001,1",
+    "data,er,awayr001,0",
+    "data,er,homep001,0",
+]
+
+SECOND_GAME = [
+    "id,BOS201904100",
+    "info,visteam,TOR",
+    "info,hometeam,BOS",
+    'start,awayb001,"Away Batter",0,1,8',
+    'start,awayr001,"Smith, Jr.",0,0,1',
+    'start,homeb001,"Home Batter",1,1,8',
+    'start,homep001,"Home Starter",1,0,1',
+    "play,1,1,homeb001,00,,W",
+]
+
+#build a game the way the parser does
+def make_game(lines):
+    return EventGame(tokenize_game([line + "\n" for line in lines]), None)
+
+@pytest.fixture
+def engine():
+    #the games are replayed in date order whatever order they come in
+    return SeasonEngine(2019).replay([make_game(SECOND_GAME), make_game(FIRST_GAME)])
+
+def test_totals_before_first_game_is_none(engine):
+    assert engine.totals_before("homeb001", "b", "04090") is None
+
+def test_totals_before_unknown_player_is_none(engine):
+    assert engine.totals_before("nobody01", "b", "04100") is None
+
+def test_batting_totals_before(engine):
+    totals = dict(zip(BATTING_STATS, engine.totals_before("homeb001", "b", "04100")))
+    assert totals == {"PA": 2, "AB": 2, "H": 1, "2B": 0, "3B": 0, "HR": 1, "BB": 0, "HBP": 0, "SF": 0}
+
+def test_batting_totals_after_last_game(engine):
+    totals = dict(zip(BATTING_STATS, engine.totals_before("homeb001", "b", "04110")))
+    assert totals["PA"] == 3
+    assert totals["BB"] == 1
+
+def test_pitching_totals_follow_substitutions(engine):
+    starter = dict(zip(PITCHING_STATS, engine.totals_before("awayp001", "p", "04100")))
+    assert starter == {"BF": 1, "outs": 0, "H": 1, "HR": 1, "BB": 0, "HBP": 0, "SO": 0, "ER": 1}
+
+    #the strikeout after the substitution belongs to the reliever
+    reliever = dict(zip(PITCHING_STATS, engine.totals_before("awayr001", "p", "04100")))
+    assert reliever == {"BF": 1, "outs": 1, "H": 0, "HR": 0, "BB": 0, "HBP": 0, "SO": 1, "ER": 0}
+
+def test_totals_before_many_matches_totals_before(engine):
+    players = ["homeb001", "homeb001", "awayb001", "nobody01"]
+    keys = [201904090, 201904100, 201904100, 201904100]
+    totals = engine.totals_before_many(players, "b", keys)
+
+    assert not totals[0].any()
+    assert np.array_equal(totals[1], engine.totals_before("homeb001", "b", "04100"))
+    assert np.array_equal(totals[2], engine.totals_before("awayb001", "b", "04100"))
+    assert not totals[3].any()
+
+def test_batting_stats_without_games_are_sentinels(engine):
+    assert engine.get_batting_stats("homeb001", "04090") == {"BA": -1.0, "OBP": -1.0, "SLG": -1.0, "OPS": -1.0}
+
+def test_batting_stats(engine):
+    stats = engine.get_batting_stats("homeb001", "04100", 2019)
+    assert stats["BA"] == pytest.approx(0.5)
+    assert stats["SLG"] == pytest.approx(2.0)